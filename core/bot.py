@@ -3,9 +3,10 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from aiogram.fsm.storage.memory import MemoryStorage
 from core.config import config
+from middlewares.ordering import UserEventIsolation
 
 bot = Bot(
     token=config.bot_token,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
-dp = Dispatcher(storage=MemoryStorage())
\ No newline at end of file
+dp = Dispatcher(storage=MemoryStorage(), events_isolation=UserEventIsolation())
\ No newline at end of file
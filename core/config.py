@@ -34,6 +34,13 @@ TARIFFS: List[Tariff] = [
 ]
 
 
+@dataclass
+class ThrottleRule:
+    """Не больше `limit` апдейтов за скользящее окно `window` секунд."""
+    limit: int
+    window: float
+
+
 @dataclass
 class Config:
     bot_token: str
@@ -46,6 +53,63 @@ class Config:
     database_url: str
     admin_ids: List[int]
     tariffs: List[Tariff] = field(default_factory=lambda: TARIFFS)
+    # Кэш проверок подписки на gate-каналы (секунды / количество записей)
+    gate_cache_member_ttl: float = 600.0
+    gate_cache_non_member_ttl: float = 30.0
+    gate_cache_channel_error_ttl: float = 60.0
+    gate_cache_max_size: int = 100_000
+    # Параллельная проверка gate-каналов
+    gate_check_concurrency: int = 10
+    gate_check_timeout: float = 5.0
+    # Антифлуд по группам хендлеров
+    throttle_payment: ThrottleRule = field(default_factory=lambda: ThrottleRule(limit=3, window=10.0))
+    throttle_menu: ThrottleRule = field(default_factory=lambda: ThrottleRule(limit=8, window=10.0))
+    throttle_admin: ThrottleRule = field(default_factory=lambda: ThrottleRule(limit=30, window=10.0))
+    # Сколько апдейтов разных пользователей обрабатывается одновременно
+    update_concurrency: int = 32
+    # Входная очередь апдейтов: лимит низкоприоритетных, дедлайн (сек), число воркеров
+    ingress_max_queue: int = 1000
+    ingress_deadline: float = 15.0
+    ingress_workers: int = 64
+    # Профиль SQLite: "default" — как есть, "production" — WAL и настроенные pragma (см. db/engine.py)
+    sqlite_profile: str = "default"
+    sqlite_busy_timeout: int = 5000
+    sqlite_pool_size: int = 8
+    # Как часто делать wal_checkpoint и optimize (секунды)
+    sqlite_maintenance_interval: float = 3600.0
+    # Пул соединений серверной БД (postgresql+asyncpg): размер, сверх лимита, пересоздание (сек)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    # Окно склейки вставок новых пользователей в одну транзакцию (сек), 0 — выключено
+    user_insert_batch_window: float = 0.0
+    # Кэш снимков пользователей (секунды / количество записей)
+    user_cache_ttl: float = 300.0
+    user_cache_max_size: int = 50_000
+    # Архивация: неактивные подписки и неоплаченные инвойсы старше N дней, размер пачки, период (сек)
+    archive_subscriptions_after_days: int = 30
+    archive_payments_after_days: int = 7
+    archive_batch_size: int = 500
+    archive_interval: float = 6 * 60 * 60
+    # Снимки SQLite: каталог, сколько хранить, период (сек)
+    backup_dir: str = "./backups"
+    backup_keep: int = 7
+    backup_interval: float = 24 * 60 * 60
+    # Профилировщик SQL: медленный запрос (мс), бюджет запросов на один апдейт
+    sql_profiler: bool = False
+    sql_slow_query_ms: float = 100.0
+    sql_query_budget: int = 10
+    # HTTP-клиент CryptoPay: соединений в пуле, keep-alive (сек), кэш DNS (сек), таймаут запроса (сек)
+    crypto_pay_connections: int = 20
+    crypto_pay_keepalive: float = 60.0
+    crypto_pay_dns_ttl: int = 300
+    crypto_pay_timeout: float = 15.0
+    # Сколько держать имя приложения из getMe (сек), 0 — до перезапуска
+    crypto_pay_identity_ttl: float = 0.0
+    # Вебхук CryptoPay (invoice_paid): порт 0 — выключен, оплату подтверждает только кнопка
+    crypto_pay_webhook_host: str = "0.0.0.0"
+    crypto_pay_webhook_port: int = 0
+    crypto_pay_webhook_path: str = "/crypto-pay/webhook"
 
 
 def load_config() -> Config:
@@ -55,6 +119,30 @@ def load_config() -> Config:
             raise ValueError(f"{key} не задан в .env")
         return val
 
+    def env_int(key: str, default: int) -> int:
+        val = os.getenv(key, "").strip()
+        return int(val) if val.lstrip("-").isdigit() else default
+
+    def env_float(key: str, default: float) -> float:
+        try:
+            return float(os.getenv(key, ""))
+        except ValueError:
+            return default
+
+    def env_bool(key: str, default: bool) -> bool:
+        val = os.getenv(key, "").strip().lower()
+        if not val:
+            return default
+        return val in ("1", "true", "yes", "on")
+
+    def env_throttle(key: str, limit: int, window: float) -> ThrottleRule:
+        # Формат: "3/10" — 3 апдейта за 10 секунд
+        raw_limit, _, raw_window = os.getenv(key, "").partition("/")
+        try:
+            return ThrottleRule(limit=int(raw_limit), window=float(raw_window))
+        except ValueError:
+            return ThrottleRule(limit=limit, window=window)
+
     raw_channels = os.getenv("REQUIRED_CHANNELS", "")
     raw_names = os.getenv("CHANNEL_NAMES", "")
     usernames = [c.strip() for c in raw_channels.split(",") if c.strip()]
@@ -81,6 +169,47 @@ def load_config() -> Config:
         database_url=os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./bot.db"),
         admin_ids=admin_ids,
         tariffs=TARIFFS,
+        gate_cache_member_ttl=env_float("GATE_CACHE_MEMBER_TTL", 600.0),
+        gate_cache_non_member_ttl=env_float("GATE_CACHE_NON_MEMBER_TTL", 30.0),
+        gate_cache_channel_error_ttl=env_float("GATE_CACHE_CHANNEL_ERROR_TTL", 60.0),
+        gate_cache_max_size=env_int("GATE_CACHE_MAX_SIZE", 100_000),
+        gate_check_concurrency=env_int("GATE_CHECK_CONCURRENCY", 10),
+        gate_check_timeout=env_float("GATE_CHECK_TIMEOUT", 5.0),
+        throttle_payment=env_throttle("THROTTLE_PAYMENT", 3, 10.0),
+        throttle_menu=env_throttle("THROTTLE_MENU", 8, 10.0),
+        throttle_admin=env_throttle("THROTTLE_ADMIN", 30, 10.0),
+        update_concurrency=env_int("UPDATE_CONCURRENCY", 32),
+        ingress_max_queue=env_int("INGRESS_MAX_QUEUE", 1000),
+        ingress_deadline=env_float("INGRESS_DEADLINE", 15.0),
+        ingress_workers=env_int("INGRESS_WORKERS", 64),
+        sqlite_profile=os.getenv("SQLITE_PROFILE", "default").strip().lower(),
+        sqlite_busy_timeout=env_int("SQLITE_BUSY_TIMEOUT", 5000),
+        sqlite_pool_size=env_int("SQLITE_POOL_SIZE", 8),
+        sqlite_maintenance_interval=env_float("SQLITE_MAINTENANCE_INTERVAL", 3600.0),
+        db_pool_size=env_int("DB_POOL_SIZE", 10),
+        db_max_overflow=env_int("DB_MAX_OVERFLOW", 20),
+        db_pool_recycle=env_int("DB_POOL_RECYCLE", 1800),
+        user_insert_batch_window=env_float("USER_INSERT_BATCH_WINDOW", 0.0),
+        user_cache_ttl=env_float("USER_CACHE_TTL", 300.0),
+        user_cache_max_size=env_int("USER_CACHE_MAX_SIZE", 50_000),
+        archive_subscriptions_after_days=env_int("ARCHIVE_SUBSCRIPTIONS_AFTER_DAYS", 30),
+        archive_payments_after_days=env_int("ARCHIVE_PAYMENTS_AFTER_DAYS", 7),
+        archive_batch_size=env_int("ARCHIVE_BATCH_SIZE", 500),
+        archive_interval=env_float("ARCHIVE_INTERVAL", 6 * 60 * 60),
+        backup_dir=os.getenv("BACKUP_DIR", "./backups"),
+        backup_keep=env_int("BACKUP_KEEP", 7),
+        backup_interval=env_float("BACKUP_INTERVAL", 24 * 60 * 60),
+        sql_profiler=env_bool("SQL_PROFILER", False),
+        sql_slow_query_ms=env_float("SQL_SLOW_QUERY_MS", 100.0),
+        sql_query_budget=env_int("SQL_QUERY_BUDGET", 10),
+        crypto_pay_connections=env_int("CRYPTO_PAY_CONNECTIONS", 20),
+        crypto_pay_keepalive=env_float("CRYPTO_PAY_KEEPALIVE", 60.0),
+        crypto_pay_dns_ttl=env_int("CRYPTO_PAY_DNS_TTL", 300),
+        crypto_pay_timeout=env_float("CRYPTO_PAY_TIMEOUT", 15.0),
+        crypto_pay_identity_ttl=env_float("CRYPTO_PAY_IDENTITY_TTL", 0.0),
+        crypto_pay_webhook_host=os.getenv("CRYPTO_PAY_WEBHOOK_HOST", "0.0.0.0"),
+        crypto_pay_webhook_port=env_int("CRYPTO_PAY_WEBHOOK_PORT", 0),
+        crypto_pay_webhook_path=os.getenv("CRYPTO_PAY_WEBHOOK_PATH", "/crypto-pay/webhook"),
     )
 
 
@@ -1,14 +1,98 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from db.models import Base
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from db.migrations import migrate
 from core.config import config
 
-engine = create_async_engine(config.database_url, echo=False)
+# Pragma профиля "production". Выполняются на каждом новом соединении пула.
+SQLITE_PRODUCTION_PRAGMAS = {
+    # Читатели не блокируются писателем, commit пишет в WAL без fsync основного файла
+    "journal_mode": "WAL",
+    # В WAL-режиме NORMAL не теряет целостность, fsync только на checkpoint
+    "synchronous": "NORMAL",
+    "cache_size": -64_000,        # 64 МБ на соединение (отрицательное — в КБ)
+    "mmap_size": 256 * 1024 ** 2,  # 256 МБ
+    "temp_store": "MEMORY",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def sqlite_pragmas(profile: str, busy_timeout: int) -> dict[str, object]:
+    if profile != "production":
+        return {}
+    return {**SQLITE_PRODUCTION_PRAGMAS, "busy_timeout": busy_timeout}
+
+
+def build_engine(url: str, sqlite_profile: str = "default") -> AsyncEngine:
+    if not is_sqlite(url):
+        # postgresql+asyncpg: pre_ping и recycle отсекают соединения, закрытые сервером или pgbouncer
+        return create_async_engine(
+            url,
+            echo=False,
+            pool_size=config.db_pool_size,
+            max_overflow=config.db_max_overflow,
+            pool_recycle=config.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+
+    pragmas = sqlite_pragmas(sqlite_profile, config.sqlite_busy_timeout)
+    if not pragmas:
+        return create_async_engine(url, echo=False)
+
+    # Писатель в SQLite всё равно один, но в WAL читатели работают параллельно с ним.
+    # Соединения держим открытыми: pragma и прогретый кэш живут в соединении.
+    engine = create_async_engine(
+        url,
+        echo=False,
+        pool_size=config.sqlite_pool_size,
+        max_overflow=config.sqlite_pool_size,
+        pool_timeout=30,
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return engine
+
+
+engine = build_engine(config.database_url, config.sqlite_profile)
 AsyncSessionFactory = async_sessionmaker(engine, expire_on_commit=False)
 
 
+class LazySession:
+    """
+    Обёртка над AsyncSession, которая создаёт сессию при первом обращении.
+    Апдейты, хендлеры которых не ходят в БД, не создают сессию вовсе.
+    """
+
+    def __init__(self, factory: async_sessionmaker[AsyncSession] = AsyncSessionFactory):
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def __getattr__(self, name: str):
+        if self._session is None:
+            self._session = self._factory()
+        return getattr(self._session, name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
 async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await migrate(engine)
 
     # Сидируем gate-каналы из .env если БД пустая
     await seed_gate_channels()
@@ -23,4 +107,13 @@ async def seed_gate_channels() -> None:
         repo = GateChannelRepo(session)
         if await repo.count() == 0 and cfg.channels:
             for ch in cfg.channels:
-                await repo.add(username=ch.username, title=ch.name)
\ No newline at end of file
+                await repo.add(username=ch.username, title=ch.name)
+
+async def sqlite_maintenance(engine: AsyncEngine = engine) -> None:
+    """
+    Переносит WAL в основной файл и обрезает его, обновляет статистику планировщика.
+    Без checkpoint-а WAL растёт, пока есть хоть один открытый читатель.
+    """
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        await conn.exec_driver_sql("PRAGMA optimize")
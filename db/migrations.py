@@ -0,0 +1,146 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import Connection, Column, Table, inspect, select, delete, update, func, text, literal
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from db.models import (
+    Base, SchemaVersion, User, Subscription, Payment, SubscriptionArchive, PaymentArchive, BalanceEntry,
+    GateMember,
+)
+
+# Схема, которую создавал create_all до появления миграций
+BASELINE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _add_column(conn: Connection, table: Table, column: Column) -> None:
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет (её мог создать create_all)."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table.name)}
+    if column.name in existing:
+        return
+    spec = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {spec}"))
+
+
+def _create_indexes(conn: Connection) -> None:
+    for table in (Subscription.__table__, Payment.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_account_summary(conn: Connection) -> None:
+    users = User.__table__
+    _add_column(conn, users, users.c.sub_count)
+    _add_column(conn, users, users.c.active_until)
+    conn.execute(
+        update(users).values(
+            sub_count=select(func.count())
+            .where(Subscription.user_id == users.c.id)
+            .scalar_subquery(),
+            active_until=select(func.max(Subscription.expires_at))
+            .where(Subscription.user_id == users.c.id, Subscription.is_active == True)
+            .scalar_subquery(),
+        )
+    )
+
+
+def _create_archive_tables(conn: Connection) -> None:
+    Base.metadata.create_all(conn, tables=[SubscriptionArchive.__table__, PaymentArchive.__table__])
+
+
+def _create_history_indexes(conn: Connection) -> None:
+    for table in (Subscription.__table__, SubscriptionArchive.__table__):
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_balance_ledger(conn: Connection) -> None:
+    users = User.__table__
+    _add_column(conn, users, users.c.balance_minor)
+    Base.metadata.create_all(conn, tables=[BalanceEntry.__table__])
+    # Переносим float-баланс в копейки и открываем журнал текущими остатками
+    conn.execute(
+        update(users).values(balance_minor=func.round(func.coalesce(users.c.balance, 0) * 100))
+    )
+    conn.execute(
+        BalanceEntry.__table__.insert().from_select(
+            ["user_id", "delta_minor", "balance_after", "reason", "created_at"],
+            select(
+                users.c.id,
+                users.c.balance_minor,
+                users.c.balance_minor,
+                literal("opening"),
+                func.current_timestamp(),
+            ).where(users.c.balance_minor != 0),
+        )
+    )
+
+
+def _reset_gate_members(conn: Connection) -> None:
+    # Индекс мог содержать ответы get_chat_member, которые ничто не обновляло;
+    # дальше он наполняется только chat_member апдейтами
+    conn.execute(delete(GateMember.__table__))
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(2, "индексы для get_active, проверки подписок и платежей пользователя", _create_indexes),
+    Migration(3, "сводка аккаунта в users: sub_count, active_until", _add_account_summary),
+    Migration(4, "архив подписок и неоплаченных платежей", _create_archive_tables),
+    Migration(5, "индексы истории подписок по (user_id, started_at, id)", _create_history_indexes),
+    Migration(6, "баланс в копейках и журнал движений баланса", _add_balance_ledger),
+    Migration(7, "сброс индекса gate-подписок, заполненного опросом Bot API", _reset_gate_members),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version if MIGRATIONS else BASELINE_VERSION
+
+
+async def _current_version(engine: AsyncEngine) -> int | None:
+    """Версия схемы или None если таблицы schema_version ещё нет."""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(SchemaVersion.version))
+            return result.scalar_one_or_none()
+    except DBAPIError:
+        return None
+
+
+def _stamp(conn: Connection, version: int) -> None:
+    conn.execute(delete(SchemaVersion))
+    conn.execute(SchemaVersion.__table__.insert().values(version=version))
+
+
+def _upgrade(conn: Connection, version: int | None) -> None:
+    if version is None:
+        if not inspect(conn).has_table("users"):
+            # Пустая БД — сразу актуальная схема
+            Base.metadata.create_all(conn)
+            _stamp(conn, LATEST_VERSION)
+            logging.info(f"Создана схема БД версии {LATEST_VERSION}")
+            return
+        # БД создана до появления миграций: досоздаём недостающие таблицы
+        Base.metadata.create_all(conn)
+        version = BASELINE_VERSION
+
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logging.info(f"Миграция БД {migration.version}: {migration.description}")
+        migration.upgrade(conn)
+        _stamp(conn, migration.version)
+
+
+async def migrate(engine: AsyncEngine) -> None:
+    """Приводит схему к LATEST_VERSION. Если версия актуальна — один SELECT и выход."""
+    version = await _current_version(engine)
+    if version == LATEST_VERSION:
+        return
+    async with engine.begin() as conn:
+        await conn.run_sync(_upgrade, version)
@@ -1,4 +1,4 @@
-from sqlalchemy import BigInteger, String, Float, DateTime, Integer, ForeignKey, Boolean
+from sqlalchemy import BigInteger, String, Float, DateTime, Integer, ForeignKey, Boolean, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from datetime import datetime
 
@@ -14,8 +14,16 @@ class User(Base):
     telegram_id: Mapped[int] = mapped_column(BigInteger, unique=True, nullable=False)
     username: Mapped[str | None] = mapped_column(String(64), nullable=True)
     full_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    # Устарело: баланс в рублях float, оставлен для совместимости схемы. Актуальный — balance_minor
     balance: Mapped[float] = mapped_column(Float, default=0.0)
+    # Баланс в копейках, меняется только через BalanceRepo вместе с записью в balance_ledger
+    balance_minor: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Сводка для главного меню, поддерживается SubscriptionRepo.create / deactivate_all
+    sub_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Самый поздний expires_at активных подписок; поддерживается SubscriptionRepo.create /
+    # deactivate / deactivate_all. Из него при старте загружается индекс активных подписок
+    active_until: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     subscriptions: Mapped[list["Subscription"]] = relationship(back_populates="user")
     payments: Mapped[list["Payment"]] = relationship(back_populates="user")
@@ -23,6 +31,14 @@ class User(Base):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # SubscriptionRepo.get_active
+        Index("ix_subscriptions_user_active_expires", "user_id", "is_active", "expires_at"),
+        # Фоновая проверка истекающих / истёкших подписок
+        Index("ix_subscriptions_active_expires", "is_active", "expires_at"),
+        # История подписок с keyset-пагинацией по (started_at, id)
+        Index("ix_subscriptions_user_started", "user_id", "started_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -36,6 +52,9 @@ class Subscription(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
@@ -48,6 +67,59 @@ class Payment(Base):
     user: Mapped["User"] = relationship(back_populates="payments")
 
 
+class SubscriptionArchive(Base):
+    """Неактивные подписки, перенесённые из subscriptions (см. tasks/archiver.py)."""
+    __tablename__ = "subscriptions_archive"
+    __table_args__ = (
+        Index("ix_subscriptions_archive_user_started", "user_id", "started_at", "id"),
+    )
+
+    # id сохраняется из subscriptions
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    tariff_id: Mapped[str] = mapped_column(String(16), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class PaymentArchive(Base):
+    """Неоплаченные инвойсы старше срока хранения, перенесённые из payments."""
+    __tablename__ = "payments_archive"
+    __table_args__ = (
+        Index("ix_payments_archive_user_id", "user_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    invoice_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    tariff_id: Mapped[str] = mapped_column(String(16), nullable=False)
+    amount_usd: Mapped[float] = mapped_column(Float, nullable=False)
+    is_paid: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class BalanceEntry(Base):
+    """Журнал движений баланса (только добавление). Сумма delta_minor равна users.balance_minor."""
+    __tablename__ = "balance_ledger"
+    __table_args__ = (
+        Index("ix_balance_ledger_user_id", "user_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    # Копейки: пополнение > 0, покупка < 0
+    delta_minor: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    balance_after: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # topup / tariff:<id> / vpn:<server> / opening
+    reason: Mapped[str] = mapped_column(String(32), nullable=False)
+    # Внешний идентификатор операции (invoice_id пополнения) — повторно не проводится
+    ref: Mapped[str | None] = mapped_column(String(64), unique=True, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class GateChannel(Base):
     """Каналы на которые нужно подписаться при входе."""
     __tablename__ = "gate_channels"
@@ -69,4 +141,21 @@ class ModChannel(Base):
     is_private: Mapped[bool] = mapped_column(Boolean, default=False)
     # Числовой ID канала — нужен для приватных каналов (выдача инвайта и кик)
     channel_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
-    added_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    added_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class GateMember(Base):
+    """Статус участника gate-канала из chat_member апдейтов (индекс подписок)."""
+    __tablename__ = "gate_members"
+
+    # username канала в нижнем регистре, с @
+    channel: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    is_member: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SchemaVersion(Base):
+    """Текущая версия схемы БД (см. db/migrations.py)."""
+    __tablename__ = "schema_version"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
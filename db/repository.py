@@ -1,8 +1,35 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
-from db.models import User, Subscription, Payment, GateChannel, ModChannel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, update, delete, insert, func, literal, DateTime, Row, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from db.models import (
+    User, Subscription, Payment, GateChannel, ModChannel, GateMember, SubscriptionArchive, PaymentArchive,
+    BalanceEntry,
+)
 from datetime import datetime, timedelta
-from typing import Optional
+from enum import Enum
+from typing import AsyncIterator, NamedTuple, Optional
+from services.channel_catalog import channel_catalog
+from services.user_batcher import user_batcher
+from services.user_cache import user_cache, UserSnapshot
+from services.subscription_index import active_subscriptions
+
+# INSERT ... ON CONFLICT — у каждого диалекта своя конструкция с одинаковым API
+ON_CONFLICT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+async def _insert_returning(session: AsyncSession, model, **values):
+    """
+    Вставка строки с INSERT ... RETURNING: id и значения по умолчанию приходят
+    в том же запросе, без SELECT-а после commit.
+    """
+    if session.bind.dialect.insert_returning:
+        return await session.scalar(insert(model).values(**values).returning(model))
+    obj = model(**values)
+    session.add(obj)
+    await session.flush()
+    return obj
 
 
 class UserRepo:
@@ -19,14 +46,118 @@ class UserRepo:
         result = await self.session.execute(select(User))
         return list(result.scalars().all())
 
+    async def count(self) -> int:
+        return await self.session.scalar(select(func.count(User.id)))
+
+    async def stream_active_until(self, batch_size: int = 1000) -> AsyncIterator[tuple[int, datetime]]:
+        """(user_id, active_until) пользователей с действующей подпиской, потоком (при старте)."""
+        result = await self.session.stream(
+            select(User.id, User.active_until)
+            .where(User.active_until > datetime.utcnow())
+            .execution_options(yield_per=batch_size)
+        )
+        async for user_id, active_until in result:
+            yield user_id, active_until
+
+    async def get_telegram_id_batch(self, after_id: int, limit: int) -> list[Row]:
+        """
+        (id, telegram_id) пачкой по users.id > after_id. Keyset-пачки вместо открытого курсора:
+        между пачками сессию закрывают, и долгая рассылка не держит блокировку SQLite.
+        """
+        result = await self.session.execute(
+            select(User.id, User.telegram_id).where(User.id > after_id).order_by(User.id).limit(limit)
+        )
+        return list(result.all())
+
+    async def get_telegram_id(self, user_id: int) -> Optional[int]:
+        return await self.session.scalar(select(User.telegram_id).where(User.id == user_id))
+
+    async def get_snapshot(self, telegram_id: int) -> Optional[UserSnapshot]:
+        """Снимок пользователя из кэша; при промахе — один SELECT нужных колонок."""
+        snapshot = user_cache.get(telegram_id)
+        if snapshot is not None:
+            return snapshot
+        result = await self.session.execute(
+            select(User.id, User.telegram_id, User.balance_minor, User.sub_count)
+            .where(User.telegram_id == telegram_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(*row)
+        user_cache.put(snapshot)
+        return snapshot
+
+    async def get_or_create_snapshot(
+        self, telegram_id: int, full_name: str, username: str | None
+    ) -> UserSnapshot:
+        snapshot = await self.get_snapshot(telegram_id)
+        if snapshot is not None:
+            return snapshot
+        user = await self.get_or_create(telegram_id, full_name, username)
+        snapshot = UserSnapshot(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            balance_minor=user.balance_minor,
+            sub_count=user.sub_count,
+        )
+        user_cache.put(snapshot)
+        return snapshot
+
     async def get_or_create(self, telegram_id: int, full_name: str, username: str | None) -> User:
         user = await self.get_by_telegram_id(telegram_id)
-        if not user:
+        if user:
+            return user
+
+        if user_batcher.enabled:
+            # Соединение не держим, пока ждём общий commit пачки
+            await self.session.commit()
+            await user_batcher.insert(telegram_id, full_name, username)
+            return await self.get_by_telegram_id(telegram_id)
+
+        dialect_insert = ON_CONFLICT_INSERTS.get(self.session.bind.dialect.name)
+        if dialect_insert is None:
             user = User(telegram_id=telegram_id, full_name=full_name, username=username)
             self.session.add(user)
             await self.session.commit()
-            await self.session.refresh(user)
-        return user
+            return user
+
+        user = await self.session.scalar(
+            dialect_insert(User)
+            .values(telegram_id=telegram_id, full_name=full_name, username=username)
+            .on_conflict_do_nothing(index_elements=[User.telegram_id])
+            .returning(User)
+        )
+        await self.session.commit()
+        # None — строку между SELECT и INSERT успел вставить параллельный апдейт
+        return user or await self.get_by_telegram_id(telegram_id)
+
+    async def insert_many(self, users: dict[int, tuple[str, str | None]]) -> None:
+        """Вставка пачки новых пользователей одной транзакцией; существующие пропускаются."""
+        rows = [
+            {"telegram_id": telegram_id, "full_name": full_name, "username": username}
+            for telegram_id, (full_name, username) in users.items()
+        ]
+        dialect_insert = ON_CONFLICT_INSERTS.get(self.session.bind.dialect.name)
+        if dialect_insert is None:
+            existing = set(await self.session.scalars(
+                select(User.telegram_id).where(User.telegram_id.in_(users))
+            ))
+            self.session.add_all(User(**row) for row in rows if row["telegram_id"] not in existing)
+        else:
+            await self.session.execute(
+                dialect_insert(User).on_conflict_do_nothing(index_elements=[User.telegram_id]),
+                rows,
+            )
+        await self.session.commit()
+
+
+class SubscriptionPage(NamedTuple):
+    # Строки (id, tariff_id, started_at, expires_at, is_active), новые сверху
+    rows: list[Row]
+    # Есть ли ещё строки в направлении листания
+    has_more: bool
+    total: int
 
 
 class SubscriptionRepo:
@@ -42,16 +173,98 @@ class SubscriptionRepo:
                 Subscription.expires_at > datetime.utcnow()
             )
             .order_by(Subscription.expires_at.desc())
+            .limit(1)
         )
         return result.scalar_one_or_none()
 
-    async def get_all(self, user_id: int) -> list[Subscription]:
+    async def get_expiring_batch(self, now: datetime, until: datetime, after_id: int, limit: int) -> list[Row]:
+        """(id, telegram_id, expires_at) активных подписок, истекающих в (now, until], по id > after_id."""
         result = await self.session.execute(
-            select(Subscription)
-            .where(Subscription.user_id == user_id)
-            .order_by(Subscription.started_at.desc())
+            select(Subscription.id, User.telegram_id, Subscription.expires_at)
+            .join(User, User.id == Subscription.user_id)
+            .where(
+                Subscription.is_active == True,
+                Subscription.expires_at > now,
+                Subscription.expires_at <= until,
+                Subscription.id > after_id,
+            )
+            .order_by(Subscription.id)
+            .limit(limit)
         )
-        return list(result.scalars().all())
+        return list(result.all())
+
+    async def get_expired_batch(self, now: datetime, limit: int) -> list[Row]:
+        """
+        (id, user_id, telegram_id) следующих истёкших, но ещё активных подписок.
+        Обработанные пачки деактивируются, поэтому следующий вызов вернёт новые строки.
+        """
+        result = await self.session.execute(
+            select(Subscription.id, Subscription.user_id, User.telegram_id)
+            .join(User, User.id == Subscription.user_id)
+            .where(Subscription.is_active == True, Subscription.expires_at <= now)
+            .order_by(Subscription.id)
+            .limit(limit)
+        )
+        return list(result.all())
+
+    async def deactivate(self, sub_ids: list[int]) -> None:
+        await self.session.execute(
+            update(Subscription)
+            .where(Subscription.id.in_(sub_ids))
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+        # active_until пересчитывается по оставшимся активным подпискам тех же пользователей
+        await self.session.execute(
+            update(User)
+            .where(User.id.in_(select(Subscription.user_id).where(Subscription.id.in_(sub_ids))))
+            .values(
+                active_until=select(func.max(Subscription.expires_at))
+                .where(Subscription.user_id == User.id, Subscription.is_active == True)
+                .scalar_subquery()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.session.commit()
+
+    async def get_page(
+        self,
+        user_id: int,
+        cursor: tuple[datetime, int] | None = None,
+        newer: bool = False,
+        limit: int = 10,
+    ) -> SubscriptionPage:
+        """
+        Страница истории (вместе с архивом) с keyset-пагинацией по (started_at, id):
+        newer=False — строки старше курсора, newer=True — новее.
+        Общее количество берётся из users.sub_count, без COUNT(*).
+        """
+        def branch(model):
+            stmt = select(
+                model.id, model.tariff_id, model.started_at, model.expires_at, model.is_active
+            ).where(model.user_id == user_id)
+            if cursor is not None:
+                key = tuple_(model.started_at, model.id)
+                stmt = stmt.where(key > cursor if newer else key < cursor)
+            return select(stmt.order_by(*order(model)).limit(limit + 1).subquery())
+
+        def order(table):
+            if newer:
+                return table.started_at.asc(), table.id.asc()
+            return table.started_at.desc(), table.id.desc()
+
+        history = union_all(branch(Subscription), branch(SubscriptionArchive)).subquery()
+        result = await self.session.execute(
+            select(history).order_by(*order(history.c)).limit(limit + 1)
+        )
+        rows = list(result.all())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newer:
+            rows.reverse()
+
+        total = await self.session.scalar(select(User.sub_count).where(User.id == user_id))
+        return SubscriptionPage(rows=rows, has_more=has_more, total=total or 0)
 
     async def create(
         self,
@@ -70,15 +283,23 @@ class SubscriptionRepo:
         else:
             expires = start + timedelta(days=days, hours=hours) + timedelta(days=30 * months)
 
-        sub = Subscription(
+        sub = await _insert_returning(
+            self.session,
+            Subscription,
             user_id=user_id,
             tariff_id=tariff_id,
             started_at=datetime.utcnow(),
             expires_at=expires,
         )
-        self.session.add(sub)
+        # Сводка для меню пишется в той же транзакции
+        await self.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(sub_count=User.sub_count + 1, active_until=expires)
+        )
         await self.session.commit()
-        await self.session.refresh(sub)
+        user_cache.forget(user_id)
+        active_subscriptions.extend(user_id, expires)
         return sub
 
     async def deactivate_all(self, user_id: int) -> int:
@@ -92,39 +313,160 @@ class SubscriptionRepo:
         subs = list(result.scalars().all())
         for sub in subs:
             sub.is_active = False
+        await self.session.execute(
+            update(User).where(User.id == user_id).values(active_until=None)
+        )
         await self.session.commit()
+        user_cache.forget(user_id)
+        active_subscriptions.remove(user_id)
         return len(subs)
 
 
+class PaidMark(Enum):
+    """Результат PaymentRepo.mark_paid."""
+    UPDATED = "updated"
+    ALREADY_PAID = "already_paid"
+    # Инвойса нет ни в payments, ни в архиве
+    NOT_FOUND = "not_found"
+
+
 class PaymentRepo:
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def create(self, user_id: int, invoice_id: str, tariff_id: str, amount: float) -> Payment:
-        payment = Payment(
+        payment = await _insert_returning(
+            self.session,
+            Payment,
             user_id=user_id,
             invoice_id=invoice_id,
             tariff_id=tariff_id,
             amount_usd=amount,
         )
-        self.session.add(payment)
         await self.session.commit()
-        await self.session.refresh(payment)
         return payment
 
-    async def get_by_invoice(self, invoice_id: str) -> Optional[Payment]:
-        result = await self.session.execute(
-            select(Payment).where(Payment.invoice_id == invoice_id)
+    async def get_by_invoice(self, invoice_id: str) -> Optional[Payment | PaymentArchive]:
+        """Инвойс из payments, а если его уже архивировали — из payments_archive."""
+        payment = await self.session.scalar(select(Payment).where(Payment.invoice_id == invoice_id))
+        if payment is not None:
+            return payment
+        return await self.session.scalar(
+            select(PaymentArchive).where(PaymentArchive.invoice_id == invoice_id)
         )
-        return result.scalar_one_or_none()
 
-    async def mark_paid(self, invoice_id: str) -> None:
-        await self.session.execute(
+    async def mark_paid(self, invoice_id: str, commit: bool = True) -> PaidMark:
+        """
+        Отмечает инвойс оплаченным (архивный сначала возвращается в payments).
+        Кнопка проверки и вебхук CryptoPay выдают покупку только получившему UPDATED.
+        С commit=False выдача коммитится вызывающим в той же транзакции.
+        """
+        if await self._set_paid(invoice_id):
+            mark = PaidMark.UPDATED
+        elif await self.session.scalar(select(Payment.id).where(Payment.invoice_id == invoice_id)) is not None:
+            mark = PaidMark.ALREADY_PAID
+        # Инвойс оплатили после архивации: возвращаем строку в payments и отмечаем её
+        elif await self._restore_archived(invoice_id):
+            mark = PaidMark.UPDATED if await self._set_paid(invoice_id) else PaidMark.ALREADY_PAID
+        else:
+            mark = PaidMark.NOT_FOUND
+        # Без отметки выдавать нечего — транзакцию закрываем сразу
+        if commit or mark is not PaidMark.UPDATED:
+            await self.session.commit()
+        return mark
+
+    async def _set_paid(self, invoice_id: str) -> bool:
+        result = await self.session.execute(
             update(Payment)
-            .where(Payment.invoice_id == invoice_id)
+            .where(Payment.invoice_id == invoice_id, Payment.is_paid == False)
             .values(is_paid=True)
         )
-        await self.session.commit()
+        return result.rowcount == 1
+
+    async def _restore_archived(self, invoice_id: str) -> bool:
+        """Переносит инвойс из payments_archive обратно в payments. False если в архиве его нет."""
+        # id не переносим: SQLite мог выдать его новой строке после архивации
+        columns = [column.name for column in Payment.__table__.columns if column.name != "id"]
+        result = await self.session.execute(
+            insert(Payment.__table__).from_select(
+                columns,
+                select(*(PaymentArchive.__table__.c[name] for name in columns))
+                .where(PaymentArchive.invoice_id == invoice_id),
+            )
+        )
+        if not result.rowcount:
+            return False
+        await self.session.execute(delete(PaymentArchive).where(PaymentArchive.invoice_id == invoice_id))
+        return True
+
+
+class BalanceRepo:
+    """
+    Баланс в копейках: users.balance_minor меняется атомарным UPDATE balance = balance + delta,
+    каждое движение пишется в balance_ledger в той же транзакции.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def credit(self, user_id: int, amount: int, reason: str, ref: str, commit: bool = True) -> bool:
+        """Зачисление. False если операция с этим ref уже проведена."""
+        dialect_insert = ON_CONFLICT_INSERTS.get(self.session.bind.dialect.name)
+        entry = {"user_id": user_id, "delta_minor": amount, "balance_after": 0, "reason": reason, "ref": ref}
+        if dialect_insert is not None:
+            result = await self.session.execute(
+                dialect_insert(BalanceEntry).values(**entry).on_conflict_do_nothing(index_elements=[BalanceEntry.ref])
+            )
+            if not result.rowcount:
+                return False
+        else:
+            try:
+                async with self.session.begin_nested():
+                    await self.session.execute(insert(BalanceEntry).values(**entry))
+            except IntegrityError:
+                return False
+
+        balance = await self._apply(user_id, amount)
+        await self.session.execute(
+            update(BalanceEntry).where(BalanceEntry.ref == ref).values(balance_after=balance)
+        )
+        await self._finish(user_id, balance, commit)
+        return True
+
+    async def debit(self, user_id: int, amount: int, reason: str, commit: bool = True) -> int | None:
+        """
+        Списание, если хватает средств. Возвращает остаток или None.
+        С commit=False покупка коммитится вызывающим вместе со списанием.
+        """
+        balance = await self._apply(user_id, -amount, User.balance_minor >= amount)
+        if balance is None:
+            return None
+        self.session.add(BalanceEntry(user_id=user_id, delta_minor=-amount, balance_after=balance, reason=reason))
+        await self._finish(user_id, balance, commit)
+        return balance
+
+    async def _finish(self, user_id: int, balance: int, commit: bool) -> None:
+        if commit:
+            await self.session.commit()
+            user_cache.update(user_id, balance_minor=balance)
+        else:
+            # Транзакцию закроет вызывающий — до commit-а снимку верить нельзя
+            user_cache.forget(user_id)
+
+    async def _apply(self, user_id: int, delta: int, *criteria) -> int | None:
+        """UPDATE balance = balance + delta; новый баланс или None если строка не подошла."""
+        stmt = (
+            update(User)
+            .where(User.id == user_id, *criteria)
+            .values(balance_minor=User.balance_minor + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if self.session.bind.dialect.update_returning:
+            return await self.session.scalar(stmt.returning(User.balance_minor))
+        result = await self.session.execute(stmt)
+        if not result.rowcount:
+            return None
+        return await self.session.scalar(select(User.balance_minor).where(User.id == user_id))
 
 
 class GateChannelRepo:
@@ -142,6 +484,7 @@ class GateChannelRepo:
         self.session.add(channel)
         await self.session.commit()
         await self.session.refresh(channel)
+        channel_catalog.publish_gate(await self.get_all())
         return channel
 
     async def remove(self, channel_id: int) -> None:
@@ -149,6 +492,7 @@ class GateChannelRepo:
             delete(GateChannel).where(GateChannel.id == channel_id)
         )
         await self.session.commit()
+        channel_catalog.publish_gate(await self.get_all())
 
     async def count(self) -> int:
         channels = await self.get_all()
@@ -189,6 +533,7 @@ class ModChannelRepo:
         self.session.add(channel)
         await self.session.commit()
         await self.session.refresh(channel)
+        channel_catalog.publish_mod(await self.get_all())
         return channel
 
     async def remove(self, channel_id: int) -> None:
@@ -196,7 +541,84 @@ class ModChannelRepo:
             delete(ModChannel).where(ModChannel.id == channel_id)
         )
         await self.session.commit()
+        channel_catalog.publish_mod(await self.get_all())
 
     async def count(self) -> int:
         channels = await self.get_all()
-        return len(channels)
\ No newline at end of file
+        return len(channels)
+
+
+class GateMemberRepo:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self) -> list[GateMember]:
+        result = await self.session.execute(select(GateMember))
+        return list(result.scalars().all())
+
+    async def upsert(self, channel: str, user_id: int, is_member: bool) -> None:
+        dialect_insert = ON_CONFLICT_INSERTS.get(self.session.bind.dialect.name)
+        if dialect_insert is None:
+            await self.session.merge(GateMember(channel=channel, user_id=user_id, is_member=is_member))
+            await self.session.commit()
+            return
+        stmt = dialect_insert(GateMember).values(
+            channel=channel, user_id=user_id, is_member=is_member, updated_at=datetime.utcnow()
+        )
+        # Один запрос вместо SELECT + INSERT/UPDATE у merge
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[GateMember.channel, GateMember.user_id],
+                set_={"is_member": stmt.excluded.is_member, "updated_at": stmt.excluded.updated_at},
+            )
+        )
+        await self.session.commit()
+
+    async def remove_channel(self, channel: str) -> None:
+        await self.session.execute(
+            delete(GateMember).where(GateMember.channel == channel)
+        )
+        await self.session.commit()
+
+
+class ArchiveRepo:
+    """Перенос отработанных строк из subscriptions и payments в архивные таблицы."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def archive_subscriptions(self, cutoff: datetime, limit: int) -> int:
+        """Неактивные подписки, начатые до cutoff. Возвращает количество перенесённых."""
+        return await self._move(
+            Subscription,
+            SubscriptionArchive,
+            (Subscription.is_active == False) & (Subscription.started_at < cutoff),
+            limit,
+        )
+
+    async def archive_payments(self, cutoff: datetime, limit: int) -> int:
+        """Неоплаченные инвойсы, созданные до cutoff."""
+        return await self._move(
+            Payment,
+            PaymentArchive,
+            (Payment.is_paid == False) & (Payment.created_at < cutoff),
+            limit,
+        )
+
+    async def _move(self, source, target, condition, limit: int) -> int:
+        """Одна пачка: INSERT ... SELECT в архив и DELETE в одной транзакции."""
+        ids = list(await self.session.scalars(
+            select(source.id).where(condition).order_by(source.id).limit(limit)
+        ))
+        if not ids:
+            return 0
+        columns = list(source.__table__.columns)
+        await self.session.execute(
+            insert(target.__table__).from_select(
+                [column.name for column in columns] + ["archived_at"],
+                select(*columns, literal(datetime.utcnow(), DateTime)).where(source.id.in_(ids)),
+            )
+        )
+        await self.session.execute(delete(source).where(source.id.in_(ids)))
+        await self.session.commit()
+        return len(ids)
@@ -1,5 +1,6 @@
+import html
 import logging
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
@@ -12,7 +13,14 @@ from keyboards.admin import (
     mod_channel_type_keyboard,
     grant_tariff_keyboard,
 )
-from services.broadcast import broadcast
+from keyboards.callbacks import (
+    AdminTariffCallback,
+    AdminDelGateCallback,
+    AdminDelModCallback,
+    AdminModTypeCallback,
+)
+from services.broadcast import broadcast, iter_telegram_ids
+from utils.routing import routes
 
 router = Router()
 
@@ -44,7 +52,7 @@ class AdminState(StatesGroup):
 
 # ─── Открыть панель ───────────────────────────────────────────────────────────
 
-@router.message(F.text == "👮 Админ-панель")
+@routes.text("👮 Админ-панель")
 async def handle_admin_panel(message: Message) -> None:
     if not is_admin(message.from_user.id):
         await message.answer("⛔️ Нет доступа.")
@@ -55,7 +63,7 @@ async def handle_admin_panel(message: Message) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data == "admin_back_to_panel")
+@routes.callback("admin_back_to_panel")
 async def back_to_panel(callback: CallbackQuery, state: FSMContext) -> None:
     await state.clear()
     await callback.answer()
@@ -65,7 +73,7 @@ async def back_to_panel(callback: CallbackQuery, state: FSMContext) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data == "admin_close")
+@routes.callback("admin_close")
 async def admin_close(callback: CallbackQuery) -> None:
     await callback.answer()
     await callback.message.delete()
@@ -73,7 +81,7 @@ async def admin_close(callback: CallbackQuery) -> None:
 
 # ─── Выдача подписки ──────────────────────────────────────────────────────────
 
-@router.callback_query(lambda c: c.data == "admin_grant_sub")
+@routes.callback("admin_grant_sub")
 async def handle_grant_sub(callback: CallbackQuery) -> None:
     if not is_admin(callback.from_user.id):
         await callback.answer("⛔️ Нет доступа.", show_alert=True)
@@ -85,11 +93,15 @@ async def handle_grant_sub(callback: CallbackQuery) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("admin_tariff:"))
-async def handle_grant_tariff(callback: CallbackQuery, state: FSMContext) -> None:
+@routes.callback(AdminTariffCallback)
+async def handle_grant_tariff(
+    callback: CallbackQuery,
+    callback_data: AdminTariffCallback,
+    state: FSMContext
+) -> None:
     if not is_admin(callback.from_user.id):
         return
-    tariff_id = callback.data.split(":")[1]
+    tariff_id = callback_data.tariff_id
     tariff = get_tariff(tariff_id)
     if not tariff:
         await callback.answer("Тариф не найден.", show_alert=True)
@@ -160,7 +172,7 @@ async def handle_grant_user_id(
 
 # ─── Удаление подписки ────────────────────────────────────────────────────────
 
-@router.callback_query(lambda c: c.data == "admin_revoke_sub")
+@routes.callback("admin_revoke_sub")
 async def handle_revoke_sub(callback: CallbackQuery, state: FSMContext) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -215,14 +227,10 @@ async def handle_revoke_user_id(
 
     # Кикаем из приватных мод-каналов
     from core.bot import bot
-    from db.engine import AsyncSessionFactory
     from services.channel import kick_user_from_channel, is_user_in_channel
+    from services.channel_catalog import channel_catalog
 
-    async with AsyncSessionFactory() as session:
-        mod_repo = ModChannelRepo(session)
-        private_channels = await mod_repo.get_private_channels()
-
-    for ch in private_channels:
+    for ch in channel_catalog.private_mod_channels:
         if not ch.channel_id:
             continue
         in_channel = await is_user_in_channel(bot, target_id, ch.channel_id)
@@ -244,7 +252,7 @@ async def handle_revoke_user_id(
 
 # ─── Gate-каналы ──────────────────────────────────────────────────────────────
 
-@router.callback_query(lambda c: c.data == "admin_gate_channels")
+@routes.callback("admin_gate_channels")
 async def handle_gate_channels(callback: CallbackQuery, gate_repo: GateChannelRepo) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -259,7 +267,7 @@ async def handle_gate_channels(callback: CallbackQuery, gate_repo: GateChannelRe
     await callback.message.edit_text(text, reply_markup=gate_channels_keyboard(channels))
 
 
-@router.callback_query(lambda c: c.data == "admin_add_gate")
+@routes.callback("admin_add_gate")
 async def handle_add_gate_start(callback: CallbackQuery, state: FSMContext) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -303,8 +311,12 @@ async def handle_add_gate_title(message: Message, state: FSMContext, gate_repo:
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("admin_del_gate:"))
-async def handle_del_gate(callback: CallbackQuery, gate_repo: GateChannelRepo) -> None:
+@routes.callback(AdminDelGateCallback)
+async def handle_del_gate(
+    callback: CallbackQuery,
+    callback_data: AdminDelGateCallback,
+    gate_repo: GateChannelRepo
+) -> None:
     if not is_admin(callback.from_user.id):
         return
     count = await gate_repo.count()
@@ -315,8 +327,7 @@ async def handle_del_gate(callback: CallbackQuery, gate_repo: GateChannelRepo) -
             show_alert=True
         )
         return
-    channel_id = int(callback.data.split(":")[1])
-    await gate_repo.remove(channel_id)
+    await gate_repo.remove(callback_data.channel_id)
     channels = await gate_repo.get_all()
     await callback.answer("✅ Канал удалён")
     text = f"📢 <b>Gate-каналы</b>\n\nТекущих каналов: <b>{len(channels)}</b>\n\n"
@@ -326,7 +337,7 @@ async def handle_del_gate(callback: CallbackQuery, gate_repo: GateChannelRepo) -
 
 # ─── Мод-каналы ───────────────────────────────────────────────────────────────
 
-@router.callback_query(lambda c: c.data == "admin_mod_channels")
+@routes.callback("admin_mod_channels")
 async def handle_mod_channels(callback: CallbackQuery, mod_repo: ModChannelRepo) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -342,7 +353,7 @@ async def handle_mod_channels(callback: CallbackQuery, mod_repo: ModChannelRepo)
     await callback.message.edit_text(text, reply_markup=mod_channels_keyboard(channels))
 
 
-@router.callback_query(lambda c: c.data == "admin_add_mod")
+@routes.callback("admin_add_mod")
 async def handle_add_mod_type(callback: CallbackQuery, state: FSMContext) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -358,12 +369,15 @@ async def handle_add_mod_type(callback: CallbackQuery, state: FSMContext) -> Non
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("admin_mod_type:"))
-async def handle_mod_type_select(callback: CallbackQuery, state: FSMContext) -> None:
+@routes.callback(AdminModTypeCallback)
+async def handle_mod_type_select(
+    callback: CallbackQuery,
+    callback_data: AdminModTypeCallback,
+    state: FSMContext
+) -> None:
     if not is_admin(callback.from_user.id):
         return
-    channel_type = callback.data.split(":")[1]
-    is_private = channel_type == "private"
+    is_private = callback_data.channel_type == "private"
     await state.update_data(mod_is_private=is_private)
     await state.set_state(AdminState.add_mod_title)
     await callback.answer()
@@ -478,12 +492,15 @@ async def handle_add_mod_url(message: Message, state: FSMContext, mod_repo: ModC
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("admin_del_mod:"))
-async def handle_del_mod(callback: CallbackQuery, mod_repo: ModChannelRepo) -> None:
+@routes.callback(AdminDelModCallback)
+async def handle_del_mod(
+    callback: CallbackQuery,
+    callback_data: AdminDelModCallback,
+    mod_repo: ModChannelRepo
+) -> None:
     if not is_admin(callback.from_user.id):
         return
-    channel_id = int(callback.data.split(":")[1])
-    await mod_repo.remove(channel_id)
+    await mod_repo.remove(callback_data.channel_id)
     channels = await mod_repo.get_all()
     await callback.answer("✅ Мод-канал удалён")
     text = f"🎮 <b>Мод-каналы</b>\n\nТекущих каналов: <b>{len(channels)}</b>\n\n"
@@ -496,9 +513,68 @@ async def handle_del_mod(callback: CallbackQuery, mod_repo: ModChannelRepo) -> N
     await callback.message.edit_text(text, reply_markup=mod_channels_keyboard(channels))
 
 
+# ─── Нагрузка ─────────────────────────────────────────────────────────────────
+
+@routes.callback("admin_stats")
+async def handle_stats(callback: CallbackQuery) -> None:
+    if not is_admin(callback.from_user.id):
+        return
+    from services.ingress import ingress
+    from services.user_cache import user_cache
+    from services.sql_profiler import sql_profiler
+    stats = ingress.stats()
+    sql_line = (
+        f"\n🐢 SQL: медленных запросов <b>{sql_profiler.slow_queries}</b>, "
+        f"апдейтов сверх бюджета <b>{sql_profiler.over_budget}</b>"
+        if sql_profiler.enabled else ""
+    )
+    await callback.answer()
+    await callback.message.edit_text(
+        f"📊 <b>Нагрузка</b>\n\n"
+        f"📥 Очередь апдейтов: <b>{stats.depth}</b> (низкий приоритет: {stats.low_depth})\n"
+        f"⏱ Возраст старейшего: <b>{stats.oldest_age:.1f} с</b>\n"
+        f"✅ Обработано: <b>{stats.processed}</b>\n"
+        f"🗑 Отброшено устаревших: <b>{stats.shed_stale}</b>\n"
+        f"🗑 Отброшено при переполнении: <b>{stats.shed_overflow}</b>\n\n"
+        f"👤 Кэш пользователей: <b>{len(user_cache)}</b> "
+        f"(попаданий {user_cache.hits}, промахов {user_cache.misses}, {user_cache.hit_rate():.0%})"
+        f"{sql_line}",
+        reply_markup=admin_menu_keyboard()
+    )
+
+
+# ─── Снимок БД ────────────────────────────────────────────────────────────────
+
+@routes.callback("admin_backup")
+async def handle_backup(callback: CallbackQuery) -> None:
+    if not is_admin(callback.from_user.id):
+        return
+    from services.backup import backups
+    if not backups.available:
+        await callback.answer("Снимки доступны только для SQLite.", show_alert=True)
+        return
+    await callback.answer("⏳ Делаю снимок...")
+    try:
+        result = await backups.snapshot()
+    except Exception as e:
+        logging.error(f"Ошибка снимка БД: {e}")
+        await callback.message.edit_text(
+            f"❌ Не удалось сделать снимок: <code>{html.escape(str(e))}</code>",
+            reply_markup=admin_menu_keyboard()
+        )
+        return
+    await callback.message.edit_text(
+        f"💾 <b>Снимок БД готов</b>\n\n"
+        f"📄 Файл: <code>{result.path.name}</code>\n"
+        f"📦 Размер: <b>{result.size / 1024:.1f} КБ</b> (без сжатия {result.raw_size / 1024:.1f} КБ)\n"
+        f"⏱ Время: <b>{result.duration:.2f} с</b>",
+        reply_markup=admin_menu_keyboard()
+    )
+
+
 # ─── Массовая рассылка ────────────────────────────────────────────────────────
 
-@router.callback_query(lambda c: c.data == "admin_broadcast")
+@routes.callback("admin_broadcast")
 async def handle_broadcast_start(callback: CallbackQuery, state: FSMContext) -> None:
     if not is_admin(callback.from_user.id):
         return
@@ -527,11 +603,10 @@ async def handle_broadcast_text(
         await message.answer("❌ Рассылка отменена.", reply_markup=admin_menu_keyboard())
         return
     text = message.text.strip()
-    all_users = await user_repo.get_all()
-    user_ids = [u.telegram_id for u in all_users]
-    await message.answer(f"📨 Начинаю рассылку для <b>{len(user_ids)}</b> пользователей...")
+    total = await user_repo.count()
+    await message.answer(f"📨 Начинаю рассылку для <b>{total}</b> пользователей...")
     from core.bot import bot
-    success, failed = await broadcast(bot, user_ids, text)
+    success, failed = await broadcast(bot, iter_telegram_ids(), text)
     await state.clear()
     await message.answer(
         f"✅ <b>Рассылка завершена!</b>\n\n"
@@ -0,0 +1,42 @@
+import logging
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+from services.channel_catalog import channel_catalog, channel_key
+from services.gate_index import gate_index
+
+router = Router()
+
+NOT_MEMBER_STATUSES = ("left", "kicked", "banned")
+
+
+def _gate_channel(update: ChatMemberUpdated) -> str | None:
+    """Ключ gate-канала если апдейт пришёл из него. Канал может быть задан username-ом или числовым ID."""
+    for name in (update.chat.username, str(update.chat.id)):
+        if name and channel_catalog.is_gate_channel(name):
+            return channel_key(name)
+    return None
+
+
+@router.chat_member()
+async def handle_chat_member(update: ChatMemberUpdated) -> None:
+    channel = _gate_channel(update)
+    if channel is None:
+        return
+    # Раз апдейт пришёл, бот в канале администратор и видит выходы участников
+    gate_index.trust_channel(channel)
+    member = update.new_chat_member
+    is_member = member.status not in NOT_MEMBER_STATUSES
+    await gate_index.update(member.user.id, channel, is_member)
+
+
+@router.my_chat_member()
+async def handle_my_chat_member(update: ChatMemberUpdated) -> None:
+    channel = _gate_channel(update)
+    if channel is None:
+        return
+    if update.new_chat_member.status == "administrator":
+        gate_index.trust_channel(channel)
+        return
+    # Без прав администратора chat_member апдейты не приходят — индексу больше нельзя верить
+    logging.warning(f"Бот потерял права администратора в {channel}, индекс канала сброшен")
+    await gate_index.forget_channel(channel)
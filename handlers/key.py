@@ -1,6 +1,7 @@
 from aiogram import Router
 from aiogram.types import Message
-from db.repository import UserRepo, SubscriptionRepo
+from db.repository import UserRepo
+from services.subscription_index import active_subscriptions
 from core.config import config
 
 router = Router()
@@ -12,13 +13,13 @@ NO_SUB_TEXT = (
 )
 
 
-async def send_key(message: Message, user_repo: UserRepo, sub_repo: SubscriptionRepo) -> None:
+async def send_key(message: Message, user_repo: UserRepo) -> None:
     from core.config import config
-    user = await user_repo.get_by_telegram_id(message.from_user.id)
+    user = await user_repo.get_snapshot(message.from_user.id)
     is_admin = message.from_user.id in config.admin_ids
-    active_sub = await sub_repo.get_active(user.id) if user else None
+    active_until = active_subscriptions.get(user.id) if user else None
 
-    if not active_sub and not is_admin:
+    if not active_until and not is_admin:
         await message.answer(NO_SUB_TEXT)
         return
 
@@ -1,7 +1,9 @@
 from aiogram import Router
 from aiogram.types import Message, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from db.repository import UserRepo, SubscriptionRepo, ModChannelRepo
+from db.repository import UserRepo
+from services.subscription_index import active_subscriptions
+from services.channel_catalog import channel_catalog
 from services.channel import create_invite_link
 import logging
 
@@ -28,22 +30,20 @@ NO_MOD_TEXT = (
 async def send_mod(
     message: Message,
     user_repo: UserRepo,
-    sub_repo: SubscriptionRepo,
-    mod_repo: ModChannelRepo
 ) -> None:
     from core.config import config
     from core.bot import bot
 
     is_admin = message.from_user.id in config.admin_ids
-    user = await user_repo.get_by_telegram_id(message.from_user.id)
-    active_sub = await sub_repo.get_active(user.id) if user else None
+    user = await user_repo.get_snapshot(message.from_user.id)
+    active_until = active_subscriptions.get(user.id) if user else None
 
-    if not active_sub and not is_admin:
-        all_subs = await sub_repo.get_all(user.id) if user else []
-        await message.answer(SUB_EXPIRED_TEXT if all_subs else NO_SUB_TEXT)
+    if not active_until and not is_admin:
+        had_subs = bool(user and user.sub_count)
+        await message.answer(SUB_EXPIRED_TEXT if had_subs else NO_SUB_TEXT)
         return
 
-    mod_channels = await mod_repo.get_all()
+    mod_channels = channel_catalog.mod_channels
 
     if not mod_channels:
         await message.answer(NO_MOD_TEXT)
@@ -1,32 +1,97 @@
 from aiogram import Router
-from aiogram.types import Message
-from db.repository import UserRepo, SubscriptionRepo
-from datetime import datetime
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
+from db.repository import UserRepo, SubscriptionRepo, SubscriptionPage
+from datetime import datetime, timedelta
+from keyboards.callbacks import SubsPageCallback
+from keyboards.my_subscriptions import subscriptions_page_keyboard
+from utils.routing import routes
 
 router = Router()
 
+PAGE_SIZE = 10
+# started_at курсора передаётся в callback_data целым числом микросекунд
+EPOCH = datetime(1970, 1, 1)
+
+
+def _cursor_callback(row, newer: bool, page: int) -> SubsPageCallback:
+    return SubsPageCallback(
+        newer=newer,
+        started_at=(row.started_at - EPOCH) // timedelta(microseconds=1),
+        sub_id=row.id,
+        page=page,
+    )
+
+
+def _render(
+    page: SubsPageCallback | None,
+    result: SubscriptionPage,
+    has_newer: bool,
+    has_older: bool,
+) -> tuple[str, InlineKeyboardMarkup | None]:
+    number = page.page if page else 0
+    now = datetime.utcnow()
+    pages = (result.total + PAGE_SIZE - 1) // PAGE_SIZE
+    header = "🔑 <b>Ваши подписки:</b>"
+    if pages > 1:
+        header += f" (стр. {number + 1} из {pages})"
+    lines = [header + "\n"]
+
+    for i, (sub_id, tariff_id, started_at, expires_at, is_active) in enumerate(
+        result.rows, start=number * PAGE_SIZE + 1
+    ):
+        status = "✅ Активна" if is_active and expires_at > now else "❌ Истекла"
+        lines.append(
+            f"<b>#{i}</b> | Тариф: <code>{tariff_id}</code>\n"
+            f"   📅 С {started_at.strftime('%d.%m.%Y')} по {expires_at.strftime('%d.%m.%Y')}\n"
+            f"   {status}"
+        )
+
+    markup = subscriptions_page_keyboard(
+        newer=_cursor_callback(result.rows[0], newer=True, page=number - 1) if has_newer else None,
+        older=_cursor_callback(result.rows[-1], newer=False, page=number + 1) if has_older else None,
+    )
+    return "\n\n".join(lines), markup
+
 
 async def send_subscriptions(message: Message, user_repo: UserRepo, sub_repo: SubscriptionRepo) -> None:
-    user = await user_repo.get_by_telegram_id(message.from_user.id)
-    subs = await sub_repo.get_all(user.id) if user else []
+    user = await user_repo.get_snapshot(message.from_user.id)
+    result = await sub_repo.get_page(user.id, limit=PAGE_SIZE) if user else None
 
-    if not subs:
+    if not result or not result.rows:
         await message.answer(
             "📭 <b>У вас нет подписок.</b>\n\n"
             "Оформите подписку через <b>🛒 Купить подписку</b>."
         )
         return
 
-    now = datetime.utcnow()
-    lines = ["🔑 <b>Ваши подписки:</b>\n"]
+    text, markup = _render(None, result, has_newer=False, has_older=result.has_more)
+    await message.answer(text, reply_markup=markup)
 
-    for i, sub in enumerate(subs, start=1):
-        is_active = sub.is_active and sub.expires_at > now
-        status = "✅ Активна" if is_active else "❌ Истекла"
-        lines.append(
-            f"<b>#{i}</b> | Тариф: <code>{sub.tariff_id}</code>\n"
-            f"   📅 С {sub.started_at.strftime('%d.%m.%Y')} по {sub.expires_at.strftime('%d.%m.%Y')}\n"
-            f"   {status}"
-        )
 
-    await message.answer("\n\n".join(lines))
\ No newline at end of file
+@routes.callback(SubsPageCallback)
+async def handle_subs_page(
+    callback: CallbackQuery,
+    callback_data: SubsPageCallback,
+    user_repo: UserRepo,
+    sub_repo: SubscriptionRepo,
+) -> None:
+    user = await user_repo.get_snapshot(callback.from_user.id)
+    if not user:
+        await callback.answer()
+        return
+
+    cursor = (EPOCH + timedelta(microseconds=callback_data.started_at), callback_data.sub_id)
+    result = await sub_repo.get_page(user.id, cursor, newer=callback_data.newer, limit=PAGE_SIZE)
+    if not result.rows:
+        await callback.answer("Больше подписок нет.")
+        return
+
+    # Страница, с которой пришли, лежит в обратном направлении — кнопка назад есть всегда
+    if callback_data.newer:
+        has_newer, has_older = result.has_more, True
+    else:
+        has_newer, has_older = True, result.has_more
+
+    text, markup = _render(callback_data, result, has_newer, has_older)
+    await callback.message.edit_text(text, reply_markup=markup)
+    await callback.answer()
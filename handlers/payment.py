@@ -1,13 +1,14 @@
-from aiogram import Router
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from db.repository import UserRepo, SubscriptionRepo, PaymentRepo
+from db.models import Subscription
+from db.repository import UserRepo, SubscriptionRepo, PaymentRepo, BalanceRepo, PaidMark
 from services.crypto_pay import crypto_pay
 from keyboards.payment import tariffs_keyboard, pay_keyboard
-from core.config import TARIFFS
-
-router = Router()
+from keyboards.callbacks import TariffCallback, TariffBalanceCallback
+from core.config import TARIFFS, Tariff
+from utils.routing import routes
+from utils.money import usd_to_minor, format_rub
 
 
 class PaymentState(StatesGroup):
@@ -18,6 +19,39 @@ def get_tariff(tariff_id: str):
     return next((t for t in TARIFFS if t.id == tariff_id), None)
 
 
+async def activate_paid_tariff(
+    invoice_id: str,
+    user_id: int,
+    tariff: Tariff,
+    sub_repo: SubscriptionRepo,
+    pay_repo: PaymentRepo,
+) -> tuple[PaidMark, Subscription | None]:
+    """Выдаёт оплаченную подписку. Подписка только при UPDATED — инвойс отметили именно здесь."""
+    # Отметка инвойса и подписка — одна транзакция: commit делает sub_repo.create
+    mark = await pay_repo.mark_paid(invoice_id, commit=False)
+    if mark is not PaidMark.UPDATED:
+        return mark, None
+    return mark, await sub_repo.create(
+        user_id=user_id,
+        tariff_id=tariff.id,
+        months=tariff.months,
+        days=tariff.days,
+        hours=tariff.hours,
+        is_infinite=tariff.is_infinite
+    )
+
+
+def paid_tariff_text(tariff: Tariff, sub: Subscription) -> str:
+    expires_text = "Навсегда" if tariff.is_infinite else f"до {sub.expires_at.strftime('%d.%m.%Y %H:%M')}"
+    return (
+        f"🎉 <b>Подписка успешно оформлена!</b>\n\n"
+        f"📅 Тариф: <b>{tariff.label}</b>\n"
+        f"💵 Оплачено: <b>{tariff.price_usd}$</b>\n"
+        f"📆 Действует: <b>{expires_text}</b>\n\n"
+        f"Используйте /start для возврата в меню."
+    )
+
+
 async def send_tariffs(message: Message) -> None:
     await message.answer(
         "🛒 <b>Выберите тариф подписки:</b>\n\n"
@@ -26,21 +60,21 @@ async def send_tariffs(message: Message) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("tariff:"))
+@routes.callback(TariffCallback)
 async def handle_tariff_select(
     callback: CallbackQuery,
+    callback_data: TariffCallback,
     state: FSMContext,
     user_repo: UserRepo,
     pay_repo: PaymentRepo,
 ) -> None:
-    tariff_id = callback.data.split(":")[1]
-    tariff = get_tariff(tariff_id)
+    tariff = get_tariff(callback_data.tariff_id)
 
     if not tariff:
         await callback.answer("Тариф не найден", show_alert=True)
         return
 
-    user = await user_repo.get_or_create(
+    user = await user_repo.get_or_create_snapshot(
         callback.from_user.id,
         callback.from_user.full_name,
         callback.from_user.username,
@@ -82,7 +116,7 @@ async def handle_tariff_select(
     )
 
 
-@router.callback_query(lambda c: c.data == "check_payment")
+@routes.callback("check_payment")
 async def handle_check_payment(
     callback: CallbackQuery,
     state: FSMContext,
@@ -110,15 +144,55 @@ async def handle_check_payment(
         await callback.answer("❌ Оплата ещё не поступила. Повторите попытку.", show_alert=True)
         return
 
-    payment = await pay_repo.get_by_invoice(invoice_id)
-    if payment and payment.is_paid:
+    tariff = get_tariff(tariff_id)
+    user = await user_repo.get_snapshot(callback.from_user.id)
+
+    mark, sub = await activate_paid_tariff(invoice_id, user.id, tariff, sub_repo, pay_repo)
+    if mark is PaidMark.NOT_FOUND:
+        # Оплата подтверждена CryptoPay, но строка инвойса не сохранилась при создании — записываем её
+        await pay_repo.create(user_id=user.id, invoice_id=invoice_id, tariff_id=tariff.id, amount=tariff.price_usd)
+        mark, sub = await activate_paid_tariff(invoice_id, user.id, tariff, sub_repo, pay_repo)
+    await state.clear()
+    if sub is None:
         await callback.answer("ℹ️ Подписка уже активирована.", show_alert=True)
         return
 
-    tariff = get_tariff(tariff_id)
-    user = await user_repo.get_by_telegram_id(callback.from_user.id)
+    await callback.answer("✅ Подписка активирована!", show_alert=True)
+    await callback.message.edit_text(paid_tariff_text(tariff, sub))
+
+
+@routes.callback(TariffBalanceCallback)
+async def handle_tariff_balance(
+    callback: CallbackQuery,
+    callback_data: TariffBalanceCallback,
+    user_repo: UserRepo,
+    sub_repo: SubscriptionRepo,
+    balance_repo: BalanceRepo,
+) -> None:
+    tariff = get_tariff(callback_data.tariff_id)
+
+    if not tariff:
+        await callback.answer("Тариф не найден", show_alert=True)
+        return
 
-    await sub_repo.create(
+    user = await user_repo.get_or_create_snapshot(
+        callback.from_user.id,
+        callback.from_user.full_name,
+        callback.from_user.username,
+    )
+    price = usd_to_minor(tariff.price_usd)
+
+    # Списание и подписка — одна транзакция: commit делает sub_repo.create
+    balance = await balance_repo.debit(user.id, price, f"tariff:{tariff.id}", commit=False)
+    if balance is None:
+        await callback.answer(
+            f"💰 Недостаточно средств: нужно {format_rub(price)}, на балансе {format_rub(user.balance_minor)}.\n"
+            f"Пополните баланс через 🎰 Пополнить баланс.",
+            show_alert=True,
+        )
+        return
+
+    sub = await sub_repo.create(
         user_id=user.id,
         tariff_id=tariff.id,
         months=tariff.months,
@@ -126,16 +200,15 @@ async def handle_check_payment(
         hours=tariff.hours,
         is_infinite=tariff.is_infinite
     )
-    await pay_repo.mark_paid(invoice_id)
-    await state.clear()
 
-    expires_text = "Навсегда" if tariff.is_infinite else f"до {(await sub_repo.get_active(user.id)).expires_at.strftime('%d.%m.%Y %H:%M')}"
+    expires_text = "Навсегда" if tariff.is_infinite else f"до {sub.expires_at.strftime('%d.%m.%Y %H:%M')}"
 
     await callback.answer("✅ Подписка активирована!", show_alert=True)
     await callback.message.edit_text(
         f"🎉 <b>Подписка успешно оформлена!</b>\n\n"
         f"📅 Тариф: <b>{tariff.label}</b>\n"
-        f"💵 Оплачено: <b>{tariff.price_usd}$</b>\n"
+        f"💰 Списано с баланса: <b>{format_rub(price)}</b>\n"
+        f"💳 Остаток: <b>{format_rub(balance)}</b>\n"
         f"📆 Действует: <b>{expires_text}</b>\n\n"
         f"Используйте /start для возврата в меню."
-    )
\ No newline at end of file
+    )
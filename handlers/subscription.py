@@ -1,24 +1,20 @@
-from aiogram import Router
 from aiogram.types import CallbackQuery
 from core.config import config
-from db.engine import AsyncSessionFactory
-from db.repository import GateChannelRepo
-from utils.subscription import check_subscriptions_db
+from services.channel_catalog import channel_catalog
+from utils.subscription import check_subscriptions_concurrent
 from keyboards.subscription import subscription_keyboard_db
+from utils.routing import routes
 
-router = Router()
 
-
-@router.callback_query(lambda c: c.data == "check_subscription")
+@routes.callback("check_subscription")
 async def handle_check_subscription(callback: CallbackQuery) -> None:
-    async with AsyncSessionFactory() as session:
-        repo = GateChannelRepo(session)
-        channels = await repo.get_all()
+    channels = channel_catalog.gate_channels
 
-    not_subscribed = await check_subscriptions_db(
+    not_subscribed = await check_subscriptions_concurrent(
         bot=callback.bot,
         user_id=callback.from_user.id,
-        channels=channels
+        channels=channels,
+        force_refresh=True,
     )
 
     if not_subscribed:
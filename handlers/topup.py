@@ -1,12 +1,12 @@
-from aiogram import Router
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from db.repository import UserRepo, PaymentRepo
+from db.repository import UserRepo, PaymentRepo, BalanceRepo
+from keyboards.callbacks import TopupCallback
 from services.crypto_pay import crypto_pay
-
-router = Router()
+from utils.routing import routes
+from utils.money import usd_to_minor, format_rub
 
 TOPUP_AMOUNTS = [1, 5, 10, 25, 50]
 
@@ -20,12 +20,38 @@ def topup_keyboard() -> any:
     for amount in TOPUP_AMOUNTS:
         builder.row(InlineKeyboardButton(
             text=f"💵 {amount}$",
-            callback_data=f"topup:{amount}"
+            callback_data=TopupCallback(amount=amount).pack()
         ))
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="topup_back"))
     return builder.as_markup()
 
 
+async def credit_paid_topup(
+    invoice_id: str,
+    user_id: int,
+    amount_usd: int | float,
+    balance_repo: BalanceRepo,
+    pay_repo: PaymentRepo,
+) -> int | None:
+    """Зачисляет оплаченное пополнение в копейках. None если инвойс уже зачислен."""
+    # Конвертируем $ в рубли по курсу utils.money.USD_TO_RUB
+    credited = usd_to_minor(float(amount_usd))
+    # Зачисление идемпотентно по invoice_id: повторная проверка ничего не начислит
+    if not await balance_repo.credit(user_id, credited, "topup", ref=invoice_id, commit=False):
+        return None
+    await pay_repo.mark_paid(invoice_id)
+    return credited
+
+
+def paid_topup_text(amount_usd: int | float, credited: int) -> str:
+    return (
+        f"✅ <b>Баланс успешно пополнен!</b>\n\n"
+        f"💵 Оплачено: <b>{amount_usd}$</b>\n"
+        f"💰 Начислено: <b>{format_rub(credited)}</b>\n\n"
+        f"Используйте /start для возврата в меню."
+    )
+
+
 async def send_topup(message: Message) -> None:
     await message.answer(
         "🎰 <b>Пополнение баланса</b>\n\n"
@@ -34,15 +60,16 @@ async def send_topup(message: Message) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("topup:"))
+@routes.callback(TopupCallback)
 async def handle_topup_amount(
     callback: CallbackQuery,
+    callback_data: TopupCallback,
     state: FSMContext,
     user_repo: UserRepo,
     pay_repo: PaymentRepo,
 ) -> None:
-    amount = float(callback.data.split(":")[1])
-    user = await user_repo.get_or_create(
+    amount = callback_data.amount
+    user = await user_repo.get_or_create_snapshot(
         callback.from_user.id,
         callback.from_user.full_name,
         callback.from_user.username,
@@ -86,12 +113,13 @@ async def handle_topup_amount(
     )
 
 
-@router.callback_query(lambda c: c.data == "topup_check")
+@routes.callback("topup_check")
 async def handle_topup_check(
     callback: CallbackQuery,
     state: FSMContext,
     user_repo: UserRepo,
     pay_repo: PaymentRepo,
+    balance_repo: BalanceRepo,
 ) -> None:
     data = await state.get_data()
     invoice_id = data.get("invoice_id")
@@ -107,41 +135,18 @@ async def handle_topup_check(
         await callback.answer("❌ Оплата ещё не поступила.", show_alert=True)
         return
 
-    payment = await pay_repo.get_by_invoice(invoice_id)
-    if payment and payment.is_paid:
+    user = await user_repo.get_snapshot(callback.from_user.id)
+    credited = await credit_paid_topup(invoice_id, user.id, amount, balance_repo, pay_repo)
+    await state.clear()
+    if credited is None:
         await callback.answer("ℹ️ Баланс уже пополнен.", show_alert=True)
         return
 
-    # Начисляем баланс (конвертируем $ в рубли — курс можно настроить)
-    usd_to_rub = 90
-    rub_amount = float(amount) * usd_to_rub
-
-    user = await user_repo.get_by_telegram_id(callback.from_user.id)
-    user.balance += rub_amount
-    await pay_repo.mark_paid(invoice_id)
-
-    from db.engine import AsyncSessionFactory
-    async with AsyncSessionFactory() as session:
-        from sqlalchemy import update
-        from db.models import User
-        await session.execute(
-            update(User)
-            .where(User.telegram_id == callback.from_user.id)
-            .values(balance=user.balance)
-        )
-        await session.commit()
-
-    await state.clear()
     await callback.answer("✅ Баланс пополнен!", show_alert=True)
-    await callback.message.edit_text(
-        f"✅ <b>Баланс успешно пополнен!</b>\n\n"
-        f"💵 Оплачено: <b>{amount}$</b>\n"
-        f"💰 Начислено: <b>{rub_amount:.0f}₽</b>\n\n"
-        f"Используйте /start для возврата в меню."
-    )
+    await callback.message.edit_text(paid_topup_text(amount, credited))
 
 
-@router.callback_query(lambda c: c.data == "topup_back")
+@routes.callback("topup_back")
 async def handle_topup_back(callback: CallbackQuery) -> None:
     await callback.answer()
     await callback.message.edit_text(
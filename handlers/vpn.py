@@ -1,12 +1,12 @@
-from aiogram import Router
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from keyboards.vpn import vpn_countries_keyboard, vpn_pay_keyboard, VPN_SERVERS, RUB_TO_USD, get_server
-from db.repository import UserRepo, PaymentRepo
+from db.repository import UserRepo, PaymentRepo, BalanceRepo, PaidMark
+from keyboards.callbacks import VpnBuyCallback, VpnBalanceCallback
 from services.crypto_pay import crypto_pay
-
-router = Router()
+from utils.routing import routes
+from utils.money import rub_to_minor, format_rub
 
 
 VPN_CONFIGS = {
@@ -78,16 +78,17 @@ async def send_vpn_menu(message: Message) -> None:
     )
 
 
-@router.callback_query(lambda c: c.data and c.data.startswith("vpn_buy:"))
+@routes.callback(VpnBuyCallback)
 async def handle_vpn_buy(
     callback: CallbackQuery,
+    callback_data: VpnBuyCallback,
     state: FSMContext,
     user_repo: UserRepo,
     pay_repo: PaymentRepo,
 ) -> None:
     from core.config import config
 
-    server_id = callback.data.split(":")[1]
+    server_id = callback_data.server_id
     server = get_server(server_id)
 
     if not server:
@@ -101,7 +102,7 @@ async def handle_vpn_buy(
         await callback.message.answer(config_text)
         return
 
-    user = await user_repo.get_or_create(
+    user = await user_repo.get_or_create_snapshot(
         callback.from_user.id,
         callback.from_user.full_name,
         callback.from_user.username,
@@ -145,10 +146,60 @@ async def handle_vpn_buy(
     )
 
 
-@router.callback_query(lambda c: c.data == "vpn_check_payment")
+@routes.callback(VpnBalanceCallback)
+async def handle_vpn_balance(
+    callback: CallbackQuery,
+    callback_data: VpnBalanceCallback,
+    user_repo: UserRepo,
+    balance_repo: BalanceRepo,
+) -> None:
+    from core.config import config
+
+    server_id = callback_data.server_id
+    server = get_server(server_id)
+
+    if not server:
+        await callback.answer("Сервер не найден.", show_alert=True)
+        return
+
+    config_text = VPN_CONFIGS.get(server_id, "⚠️ Конфиг не найден. Обратитесь к администратору.")
+
+    if callback.from_user.id in config.admin_ids:
+        await callback.answer()
+        await callback.message.answer(config_text)
+        return
+
+    user = await user_repo.get_or_create_snapshot(
+        callback.from_user.id,
+        callback.from_user.full_name,
+        callback.from_user.username,
+    )
+    price = rub_to_minor(server["price_rub"])
+
+    balance = await balance_repo.debit(user.id, price, f"vpn:{server_id}")
+    if balance is None:
+        await callback.answer(
+            f"💰 Недостаточно средств: нужно {format_rub(price)}, на балансе {format_rub(user.balance_minor)}.\n"
+            f"Пополните баланс через 🎰 Пополнить баланс.",
+            show_alert=True,
+        )
+        return
+
+    await callback.answer("✅ Оплачено с баланса!", show_alert=True)
+    await callback.message.edit_text(
+        f"✅ <b>Оплата прошла успешно!</b>\n\n"
+        f"💰 Списано с баланса: <b>{format_rub(price)}</b>\n"
+        f"💳 Остаток: <b>{format_rub(balance)}</b>\n\n"
+        f"Ваш VPN конфиг готов 👇"
+    )
+    await callback.message.answer(config_text)
+
+
+@routes.callback("vpn_check_payment")
 async def handle_vpn_check_payment(
     callback: CallbackQuery,
     state: FSMContext,
+    user_repo: UserRepo,
     pay_repo: PaymentRepo,
 ) -> None:
     data = await state.get_data()
@@ -169,14 +220,28 @@ async def handle_vpn_check_payment(
         await callback.answer("❌ Оплата ещё не поступила. Повторите попытку.", show_alert=True)
         return
 
-    payment = await pay_repo.get_by_invoice(invoice_id)
-    if payment and payment.is_paid:
+    # Конфиг выдаёт тот, кто первым отметил инвойс: эта кнопка или вебхук CryptoPay
+    mark = await pay_repo.mark_paid(invoice_id)
+    if mark is PaidMark.NOT_FOUND:
+        # Оплата подтверждена CryptoPay, но строка инвойса не сохранилась при создании — записываем её
+        user = await user_repo.get_or_create_snapshot(
+            callback.from_user.id,
+            callback.from_user.full_name,
+            callback.from_user.username,
+        )
+        await pay_repo.create(
+            user_id=user.id,
+            invoice_id=invoice_id,
+            tariff_id=f"vpn_{server_id}",
+            amount=round(get_server(server_id)["price_rub"] * RUB_TO_USD, 2),
+        )
+        mark = await pay_repo.mark_paid(invoice_id)
+    if mark is not PaidMark.UPDATED:
         await callback.answer("ℹ️ Конфиг уже был выдан.", show_alert=True)
         config_text = VPN_CONFIGS.get(server_id, "⚠️ Конфиг не найден.")
         await callback.message.answer(config_text)
         return
 
-    await pay_repo.mark_paid(invoice_id)
     await state.clear()
 
     config_text = VPN_CONFIGS.get(server_id, "⚠️ Конфиг не найден. Обратитесь к администратору.")
@@ -186,7 +251,7 @@ async def handle_vpn_check_payment(
     await callback.message.answer(config_text)
 
 
-@router.callback_query(lambda c: c.data == "vpn_back")
+@routes.callback("vpn_back")
 async def handle_vpn_back(callback: CallbackQuery, state: FSMContext) -> None:
     await state.clear()
     await callback.answer()
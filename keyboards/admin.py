@@ -1,6 +1,12 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from db.models import GateChannel, ModChannel
+from keyboards.callbacks import (
+    AdminTariffCallback,
+    AdminDelGateCallback,
+    AdminDelModCallback,
+    AdminModTypeCallback,
+)
 from typing import List
 
 
@@ -11,6 +17,8 @@ def admin_menu_keyboard() -> InlineKeyboardMarkup:
     builder.row(InlineKeyboardButton(text="📢 Gate-каналы (подписка)", callback_data="admin_gate_channels"))
     builder.row(InlineKeyboardButton(text="🎮 Мод-каналы (скачать мод)", callback_data="admin_mod_channels"))
     builder.row(InlineKeyboardButton(text="📨 Массовая рассылка", callback_data="admin_broadcast"))
+    builder.row(InlineKeyboardButton(text="📊 Нагрузка", callback_data="admin_stats"))
+    builder.row(InlineKeyboardButton(text="💾 Снимок БД", callback_data="admin_backup"))
     builder.row(InlineKeyboardButton(text="❌ Закрыть", callback_data="admin_close"))
     return builder.as_markup()
 
@@ -20,7 +28,7 @@ def gate_channels_keyboard(channels: List[GateChannel]) -> InlineKeyboardMarkup:
     for ch in channels:
         builder.row(InlineKeyboardButton(
             text=f"🗑 Удалить {ch.title}",
-            callback_data=f"admin_del_gate:{ch.id}"
+            callback_data=AdminDelGateCallback(channel_id=ch.id).pack()
         ))
     builder.row(InlineKeyboardButton(text="➕ Добавить канал", callback_data="admin_add_gate"))
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_back_to_panel"))
@@ -33,7 +41,7 @@ def mod_channels_keyboard(channels: List[ModChannel]) -> InlineKeyboardMarkup:
         lock = "🔒" if ch.is_private else "🌐"
         builder.row(InlineKeyboardButton(
             text=f"🗑 Удалить {lock} {ch.title}",
-            callback_data=f"admin_del_mod:{ch.id}"
+            callback_data=AdminDelModCallback(channel_id=ch.id).pack()
         ))
     builder.row(InlineKeyboardButton(text="➕ Добавить мод-канал", callback_data="admin_add_mod"))
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_back_to_panel"))
@@ -42,8 +50,8 @@ def mod_channels_keyboard(channels: List[ModChannel]) -> InlineKeyboardMarkup:
 
 def mod_channel_type_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    builder.row(InlineKeyboardButton(text="🌐 Публичный канал", callback_data="admin_mod_type:public"))
-    builder.row(InlineKeyboardButton(text="🔒 Приватный канал", callback_data="admin_mod_type:private"))
+    builder.row(InlineKeyboardButton(text="🌐 Публичный канал", callback_data=AdminModTypeCallback(channel_type="public").pack()))
+    builder.row(InlineKeyboardButton(text="🔒 Приватный канал", callback_data=AdminModTypeCallback(channel_type="private").pack()))
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_mod_channels"))
     return builder.as_markup()
 
@@ -54,7 +62,7 @@ def grant_tariff_keyboard() -> InlineKeyboardMarkup:
     for tariff in TARIFFS:
         builder.row(InlineKeyboardButton(
             text=f"📅 {tariff.label} — {tariff.price_usd}$",
-            callback_data=f"admin_tariff:{tariff.id}"
+            callback_data=AdminTariffCallback(tariff_id=tariff.id).pack()
         ))
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_back_to_panel"))
     return builder.as_markup()
\ No newline at end of file
@@ -0,0 +1,57 @@
+from aiogram.filters.callback_data import CallbackData
+
+
+class TariffCallback(CallbackData, prefix="tariff"):
+    tariff_id: str
+
+
+class TopupCallback(CallbackData, prefix="topup"):
+    amount: float
+
+
+class VpnBuyCallback(CallbackData, prefix="vpn_buy"):
+    server_id: str
+
+
+class TariffBalanceCallback(CallbackData, prefix="tariff_bal"):
+    tariff_id: str
+
+
+class VpnBalanceCallback(CallbackData, prefix="vpn_bal"):
+    server_id: str
+
+
+class SubsPageCallback(CallbackData, prefix="subs_page"):
+    # Курсор keyset-пагинации: (started_at в микросекундах, id) крайней строки текущей страницы
+    newer: bool
+    started_at: int
+    sub_id: int
+    page: int
+
+
+class AdminTariffCallback(CallbackData, prefix="admin_tariff"):
+    tariff_id: str
+
+
+class AdminDelGateCallback(CallbackData, prefix="admin_del_gate"):
+    channel_id: int
+
+
+class AdminDelModCallback(CallbackData, prefix="admin_del_mod"):
+    channel_id: int
+
+
+class AdminModTypeCallback(CallbackData, prefix="admin_mod_type"):
+    channel_type: str
+
+
+# Callback-и оплаты: у антифлуда свой лимит, входная очередь никогда их не отбрасывает
+PAYMENT_CALLBACKS = frozenset({"check_payment", "topup_check", "vpn_check_payment"})
+PAYMENT_PREFIXES = tuple(
+    f"{factory.__prefix__}:"
+    for factory in (TariffCallback, TopupCallback, VpnBuyCallback, TariffBalanceCallback, VpnBalanceCallback)
+)
+
+
+def is_payment_callback(data: str) -> bool:
+    return data in PAYMENT_CALLBACKS or data.startswith(PAYMENT_PREFIXES)
@@ -0,0 +1,19 @@
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.callbacks import SubsPageCallback
+
+
+def subscriptions_page_keyboard(
+    newer: SubsPageCallback | None,
+    older: SubsPageCallback | None,
+) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if newer:
+        buttons.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=newer.pack()))
+    if older:
+        buttons.append(InlineKeyboardButton(text="Старше ➡️", callback_data=older.pack()))
+    if not buttons:
+        return None
+    builder = InlineKeyboardBuilder()
+    builder.row(*buttons)
+    return builder.as_markup()
@@ -1,6 +1,8 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from core.config import TARIFFS
+from keyboards.callbacks import TariffCallback, TariffBalanceCallback
+from utils.money import usd_to_minor, format_rub
 
 
 def tariffs_keyboard() -> InlineKeyboardMarkup:
@@ -9,8 +11,12 @@ def tariffs_keyboard() -> InlineKeyboardMarkup:
         builder.row(
             InlineKeyboardButton(
                 text=f"📅 {tariff.label} — {tariff.price_usd}$",
-                callback_data=f"tariff:{tariff.id}"
-            )
+                callback_data=TariffCallback(tariff_id=tariff.id).pack()
+            ),
+            InlineKeyboardButton(
+                text=f"💰 {format_rub(usd_to_minor(tariff.price_usd))} с баланса",
+                callback_data=TariffBalanceCallback(tariff_id=tariff.id).pack()
+            ),
         )
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="back_to_menu"))
     return builder.as_markup()
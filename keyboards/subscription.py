@@ -1,10 +1,10 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from db.models import GateChannel
-from typing import List
+from services.channel_catalog import GateChannelInfo
+from typing import Sequence
 
 
-def subscription_keyboard_db(channels: List[GateChannel]) -> InlineKeyboardMarkup:
+def subscription_keyboard_db(channels: Sequence[GateChannelInfo]) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
     for channel in channels:
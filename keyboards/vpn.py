@@ -1,5 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
+from keyboards.callbacks import VpnBuyCallback, VpnBalanceCallback
 
 
 VPN_SERVERS = [
@@ -24,10 +25,16 @@ def vpn_countries_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     for server in VPN_SERVERS:
         price_usd = round(server["price_rub"] * RUB_TO_USD, 2)
-        builder.row(InlineKeyboardButton(
-            text=f"{server['flag']} {server['country']} — {server['price_rub']}₽ / 1 Server",
-            callback_data=f"vpn_buy:{server['id']}"
-        ))
+        builder.row(
+            InlineKeyboardButton(
+                text=f"{server['flag']} {server['country']} — {server['price_rub']}₽ / 1 Server",
+                callback_data=VpnBuyCallback(server_id=server["id"]).pack()
+            ),
+            InlineKeyboardButton(
+                text="💰 С баланса",
+                callback_data=VpnBalanceCallback(server_id=server["id"]).pack()
+            ),
+        )
     builder.row(InlineKeyboardButton(text="⬅️ Назад", callback_data="vpn_back"))
     return builder.as_markup()
 
@@ -3,31 +3,57 @@ import logging
 from aiogram import Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 from core.bot import bot, dp
-from db.engine import init_db
+from core.config import config
+from db.engine import engine, init_db, is_sqlite
 from middlewares.subscription import SubscriptionMiddleware
-from middlewares.db import DatabaseMiddleware
+from middlewares.db import DatabaseMiddleware, RepositoryMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.ordering import ConcurrencyLimitMiddleware
+from middlewares.profiler import SqlProfileMiddleware, SqlHandlerMiddleware
+# Импорт модулей handlers регистрирует их маршруты в routes
 from handlers import subscription as sub_handler
-from handlers import menu, key, mod, my_subscriptions, payment, admin, topup, vpn
+from handlers import menu, key, mod, my_subscriptions, payment, admin, topup, vpn, chat_member
 from tasks.subscription_checker import run_subscription_checker
+from tasks.db_maintenance import run_db_maintenance
+from tasks.archiver import run_archiver
+from tasks.backup import run_backups
+from services.backup import backups
+from utils.routing import routes
+from services.gate_index import gate_index
+from services.channel_catalog import channel_catalog
+from services.subscription_index import active_subscriptions
+from services.ingress import ingress
+from services.sql_profiler import sql_profiler
+from services.crypto_pay import crypto_pay
+from services.crypto_webhook import crypto_webhook
 
 
 def setup_routers(dp: Dispatcher) -> None:
-    dp.include_router(sub_handler.router)
+    # FSM-хендлеры админки должны перехватывать текст раньше кнопок меню
     dp.include_router(admin.router)
+    # Callback-и и кнопки меню из всех модулей handlers — через индекс маршрутов
+    dp.include_router(routes.router)
     dp.include_router(menu.router)
     dp.include_router(key.router)
     dp.include_router(mod.router)
     dp.include_router(my_subscriptions.router)
-    dp.include_router(payment.router)
-    dp.include_router(topup.router)
-    dp.include_router(vpn.router)
+    dp.include_router(chat_member.router)
 
 
 def setup_middlewares(dp: Dispatcher) -> None:
-    dp.message.middleware(DatabaseMiddleware())
-    dp.callback_query.middleware(DatabaseMiddleware())
+    # Outer-middleware Update идут после встроенного FSM-middleware,
+    # то есть уже внутри пользовательского лока (см. UserEventIsolation)
+    dp.update.outer_middleware(ThrottlingMiddleware())
+    dp.update.outer_middleware(ConcurrencyLimitMiddleware(config.update_concurrency))
+    if sql_profiler.enabled:
+        dp.update.outer_middleware(SqlProfileMiddleware())
+        dp.message.middleware(SqlHandlerMiddleware())
+        dp.callback_query.middleware(SqlHandlerMiddleware())
+    dp.update.outer_middleware(DatabaseMiddleware())
     dp.message.middleware(SubscriptionMiddleware())
     dp.callback_query.middleware(SubscriptionMiddleware())
+    dp.message.middleware(RepositoryMiddleware())
+    dp.callback_query.middleware(RepositoryMiddleware())
 
 
 async def main() -> None:
@@ -36,14 +62,32 @@ async def main() -> None:
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s"
     )
 
+    sql_profiler.install(engine)
     await init_db()
+    await channel_catalog.load()
+    await gate_index.load()
+    await gate_index.verify_channels(bot, channel_catalog.gate_channels)
+    await active_subscriptions.load()
     setup_middlewares(dp)
     setup_routers(dp)
+    # Пул соединений с CryptoPay живёт всё время работы бота
+    dp.startup.register(crypto_pay.start)
+    dp.shutdown.register(crypto_pay.close)
+    if crypto_webhook.enabled:
+        dp.startup.register(crypto_webhook.start)
+        dp.shutdown.register(crypto_webhook.stop)
 
     asyncio.create_task(run_subscription_checker(bot))
+    asyncio.create_task(run_archiver())
+    if is_sqlite(config.database_url) and config.sqlite_profile == "production":
+        asyncio.create_task(run_db_maintenance())
+    if backups.available:
+        asyncio.create_task(run_backups())
 
     logging.info("🤖 Бот запущен")
-    await dp.start_polling(bot)
+    # Апдейты разных пользователей — параллельно, одного пользователя — по очереди.
+    # Входная очередь отбрасывает устаревшие апдейты при перегрузке.
+    await ingress.run_polling(bot, dp)
 
 
 if __name__ == "__main__":
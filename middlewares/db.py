@@ -1,22 +1,55 @@
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
-from db.engine import AsyncSessionFactory
-from db.repository import UserRepo, SubscriptionRepo, PaymentRepo, GateChannelRepo, ModChannelRepo
+from db.engine import LazySession
+from db.repository import UserRepo, SubscriptionRepo, PaymentRepo, BalanceRepo, GateChannelRepo, ModChannelRepo
+
+# Имя аргумента хендлера -> класс репозитория
+REPOSITORIES = {
+    "user_repo": UserRepo,
+    "sub_repo": SubscriptionRepo,
+    "pay_repo": PaymentRepo,
+    "balance_repo": BalanceRepo,
+    "gate_repo": GateChannelRepo,
+    "mod_repo": ModChannelRepo,
+}
 
 
 class DatabaseMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на Update: одна ленивая сессия на весь апдейт,
+    общая для всех middleware и хендлеров.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        session = LazySession()
+        data["session"] = session
+        try:
+            return await handler(event, data)
+        finally:
+            await session.close()
+
+
+class RepositoryMiddleware(BaseMiddleware):
+    """Создаёт только те репозитории, которые запрашивает выбранный хендлер."""
+
     async def __call__(
         self,
         handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
         event: TelegramObject,
         data: Dict[str, Any],
     ) -> Any:
-        async with AsyncSessionFactory() as session:
-            data["session"] = session
-            data["user_repo"] = UserRepo(session)
-            data["sub_repo"] = SubscriptionRepo(session)
-            data["pay_repo"] = PaymentRepo(session)
-            data["gate_repo"] = GateChannelRepo(session)
-            data["mod_repo"] = ModChannelRepo(session)
-            return await handler(event, data)
\ No newline at end of file
+        session = data["session"]
+        # Для маршрутов из индекса реальный хендлер лежит в data["route"]
+        target = data.get("route") or data.get("handler")
+        for name, repo_cls in REPOSITORIES.items():
+            if name in data:
+                continue
+            if target is None or target.varkw or name in target.params:
+                data[name] = repo_cls(session)
+        return await handler(event, data)
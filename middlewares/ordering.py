@@ -0,0 +1,59 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.base import BaseEventIsolation, StorageKey
+from aiogram.types import TelegramObject
+
+
+class UserEventIsolation(BaseEventIsolation):
+    """
+    Апдейты одного пользователя обрабатываются строго по очереди (asyncio.Lock — FIFO).
+    FSM-middleware берёт этот лок до чтения состояния, поэтому переходы
+    вроде PaymentState.waiting_payment не перемешиваются.
+    Локи удаляются, как только у пользователя не остаётся апдейтов в работе.
+    """
+
+    def __init__(self):
+        self._locks: dict[tuple[int, int], asyncio.Lock] = {}
+        self._waiters: dict[tuple[int, int], int] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        lock_key = (key.bot_id, key.user_id)
+        lock = self._locks.get(lock_key)
+        if lock is None:
+            lock = self._locks[lock_key] = asyncio.Lock()
+        self._waiters[lock_key] = self._waiters.get(lock_key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[lock_key] -= 1
+            if not self._waiters[lock_key]:
+                del self._waiters[lock_key]
+                del self._locks[lock_key]
+
+    async def close(self) -> None:
+        self._locks.clear()
+        self._waiters.clear()
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Глобальный лимит одновременно обрабатываемых апдейтов.
+    Регистрируется после FSM-middleware, то есть слот занимается уже после
+    пользовательского лока: очередь апдейтов одного пользователя не держит слоты.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
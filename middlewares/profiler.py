@@ -0,0 +1,38 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+from services.sql_profiler import sql_profiler
+
+
+class SqlProfileMiddleware(BaseMiddleware):
+    """Outer-middleware на Update: все запросы апдейта попадают в один профиль."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_id = event.update_id if isinstance(event, Update) else None
+        with sql_profiler.profile(update_id):
+            return await handler(event, data)
+
+
+class SqlHandlerMiddleware(BaseMiddleware):
+    """
+    Inner-middleware: подписывает профиль именем выбранного хендлера.
+    Регистрируется первым, чтобы запросы проверки подписки тоже достались хендлеру.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        # Для маршрутов из индекса реальный хендлер лежит в data["route"]
+        target = data.get("route") or data.get("handler")
+        if target is not None:
+            callback = target.callback
+            sql_profiler.set_handler(f"{callback.__module__}.{callback.__qualname__}")
+        return await handler(event, data)
@@ -2,8 +2,7 @@ from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject, Message, CallbackQuery
 from core.config import config
-from db.engine import AsyncSessionFactory
-from db.repository import GateChannelRepo
+from services.channel_catalog import channel_catalog
 
 
 SUBSCRIPTION_TEXT = (
@@ -33,10 +32,7 @@ class SubscriptionMiddleware(BaseMiddleware):
         if isinstance(event, CallbackQuery) and event.data == "check_subscription":
             return await handler(event, data)
 
-        # Загружаем каналы из БД
-        async with AsyncSessionFactory() as session:
-            repo = GateChannelRepo(session)
-            channels = await repo.get_all()
+        channels = channel_catalog.gate_channels
 
         if not channels:
             return await handler(event, data)
@@ -44,8 +40,8 @@ class SubscriptionMiddleware(BaseMiddleware):
         bot = data["bot"]
 
         # Проверяем подписки
-        from utils.subscription import check_subscriptions_db
-        not_subscribed = await check_subscriptions_db(bot, user_id, channels)
+        from utils.subscription import check_subscriptions_concurrent
+        not_subscribed = await check_subscriptions_concurrent(bot, user_id, channels)
 
         if not not_subscribed:
             return await handler(event, data)
@@ -0,0 +1,107 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+from core.config import config, ThrottleRule
+from keyboards.callbacks import is_payment_callback
+
+# Как часто чистить счётчики простаивающих пользователей (секунды)
+SWEEP_INTERVAL = 60.0
+
+
+class _Window:
+    """Счётчик скользящего окна: текущее и предыдущее окно + флаг предупреждения."""
+    __slots__ = ("started_at", "previous", "current", "warned")
+
+    def __init__(self, now: float):
+        self.started_at = now
+        self.previous = 0
+        self.current = 0
+        self.warned = False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Outer-middleware на Update: отбрасывает лишние апдейты пользователя
+    до того, как откроется сессия БД и начнутся проверки подписки.
+    Ограничиваются только сообщения и нажатия кнопок: в chat_member и прочих
+    служебных апдейтах пользователь — это администратор канала, и массовый
+    кик не должен терять события для индекса подписок.
+    """
+
+    def __init__(self, rules: Dict[str, ThrottleRule] | None = None):
+        self.rules = rules or {
+            "payment": config.throttle_payment,
+            "menu": config.throttle_menu,
+            "admin": config.throttle_admin,
+        }
+        self._windows: dict[tuple[int, str], _Window] = {}
+        self._last_sweep = time.monotonic()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        if user is None or not isinstance(event, Update):
+            return await handler(event, data)
+        if event.message is None and event.callback_query is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL:
+            self._sweep(now)
+
+        group = self._group(event, user.id)
+        if self._hit(user.id, group, now):
+            return await handler(event, data)
+
+        window = self._windows[(user.id, group)]
+        if event.callback_query and not window.warned:
+            # Убираем «часики» на кнопке один раз за окно, дальше молча отбрасываем
+            window.warned = True
+            await event.callback_query.answer("⏳ Слишком часто, подождите немного.")
+        return None
+
+    @staticmethod
+    def _group(event: Update, user_id: int) -> str:
+        if user_id in config.admin_ids:
+            return "admin"
+        if event.callback_query and event.callback_query.data:
+            if is_payment_callback(event.callback_query.data):
+                return "payment"
+        return "menu"
+
+    def _hit(self, user_id: int, group: str, now: float) -> bool:
+        """Учитывает апдейт; False если лимит группы превышен."""
+        rule = self.rules[group]
+        key = (user_id, group)
+        window = self._windows.get(key)
+        if window is None:
+            window = self._windows[key] = _Window(now)
+
+        elapsed = now - window.started_at
+        if elapsed >= rule.window:
+            # Сдвигаем окно; если простаивали дольше двух окон — предыдущее пустое
+            window.previous = window.current if elapsed < 2 * rule.window else 0
+            window.current = 0
+            window.started_at = now - (elapsed % rule.window)
+            window.warned = False
+            elapsed = now - window.started_at
+
+        weight = 1 - elapsed / rule.window
+        if window.previous * weight + window.current >= rule.limit:
+            return False
+        window.current += 1
+        return True
+
+    def _sweep(self, now: float) -> None:
+        self._last_sweep = now
+        idle = [
+            key for key, window in self._windows.items()
+            if now - window.started_at >= 2 * self.rules[key[1]].window
+        ]
+        for key in idle:
+            del self._windows[key]
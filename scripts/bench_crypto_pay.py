@@ -0,0 +1,91 @@
+"""
+Задержка вызовов CryptoPay: новая ClientSession на каждый запрос (как было)
+против общей сессии CryptoPayService с пулом keep-alive соединений.
+
+Вместо CryptoPay — локальный aiohttp-сервер с теми же методами
+(getMe, createInvoice, getInvoices). Локально нет DNS и TLS, поэтому
+разница — только установка TCP и создание сессии; на pay.crypt.bot
+к ней добавляются резолв и TLS-рукопожатие.
+
+Запуск: python -m scripts.bench_crypto_pay
+"""
+import asyncio
+import statistics
+import time
+import aiohttp
+from aiohttp import web
+from services.crypto_pay import CryptoPayService
+
+CALLS = 300
+CONCURRENCY = 10
+
+
+def stand_in_app() -> web.Application:
+    async def get_me(request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": {"app_id": 1, "name": "bench_bot"}})
+
+    async def create_invoice(request: web.Request) -> web.Response:
+        params = await request.json()
+        return web.json_response({"ok": True, "result": {
+            "invoice_id": 1, "pay_url": "https://t.me/CryptoBot?start=bench", "payload": params["payload"],
+        }})
+
+    async def get_invoices(request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "result": {"items": [{"invoice_id": 1, "status": "active"}]}})
+
+    app = web.Application()
+    app.router.add_get("/api/getMe", get_me)
+    app.router.add_post("/api/createInvoice", create_invoice)
+    app.router.add_get("/api/getInvoices", get_invoices)
+    return app
+
+
+async def get_invoice_per_call(base_url: str) -> None:
+    # Прежняя реализация CryptoPayService.get_invoice
+    async with aiohttp.ClientSession(headers={"Crypto-Pay-API-Token": "bench"}) as session:
+        async with session.get(f"{base_url}/getInvoices", params={"invoice_ids": "1"}) as resp:
+            await resp.json()
+
+
+async def measure(call, calls: int, concurrency: int) -> list[float]:
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:>28}: среднее {statistics.mean(latencies) * 1000:6.2f} мс, p95 {p95 * 1000:6.2f} мс")
+
+
+async def main(calls: int = CALLS) -> None:
+    runner = web.AppRunner(stand_in_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}/api"
+
+    service = CryptoPayService(token="bench", base_url=base_url)
+    await service.start()
+    try:
+        for concurrency in (1, CONCURRENCY):
+            print(f"getInvoices, {calls} вызовов, параллельно {concurrency}:")
+            report("сессия на вызов", await measure(lambda: get_invoice_per_call(base_url), calls, concurrency))
+            report("общая сессия", await measure(lambda: service.get_invoice(["1"]), calls, concurrency))
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+Микро-бенчмарк диспетчеризации: цепочка lambda/F.text фильтров (как было)
+против индекса маршрутов utils.routing.RouteIndex.
+
+Запуск: python -m scripts.bench_routing
+"""
+import asyncio
+import time
+from datetime import datetime
+from aiogram import Bot, Dispatcher, Router, F
+from aiogram.types import Update, CallbackQuery, Message, Chat, User
+from utils.routing import RouteIndex
+from keyboards.callbacks import (
+    TariffCallback,
+    TopupCallback,
+    VpnBuyCallback,
+    AdminTariffCallback,
+    AdminDelGateCallback,
+    AdminDelModCallback,
+    AdminModTypeCallback,
+)
+
+EXACT_CALLBACKS = [
+    "check_subscription", "admin_back_to_panel", "admin_close", "admin_grant_sub",
+    "admin_revoke_sub", "admin_gate_channels", "admin_add_gate", "admin_mod_channels",
+    "admin_add_mod", "admin_broadcast", "check_payment", "topup_check", "topup_back",
+    "vpn_check_payment", "vpn_back",
+]
+FACTORIES = [
+    AdminTariffCallback, AdminDelGateCallback, AdminModTypeCallback, AdminDelModCallback,
+    TariffCallback, TopupCallback, VpnBuyCallback,
+]
+TEXTS = [
+    "👮 Админ-панель", "📥 Скачать мод", "🔧 Мои подписки",
+    "🛒 Купить подписку", "🎰 Пополнить баланс", "🌐 Купить ВПН",
+]
+
+SAMPLES = [
+    "check_subscription", "tariff:7d", "check_payment", "vpn_buy:nl",
+    "topup:5", "vpn_back", "admin_del_mod:3", "topup_check",
+]
+TEXT_SAMPLES = ["🛒 Купить подписку", "🌐 Купить ВПН", "📥 Скачать мод"]
+
+
+async def noop(*args, **kwargs) -> None:
+    return None
+
+
+def legacy_dispatcher() -> Dispatcher:
+    """Фильтры в том виде, в каком они были до индекса."""
+    dp = Dispatcher()
+    router = Router()
+    for data in EXACT_CALLBACKS:
+        router.callback_query.register(noop, lambda c, d=data: c.data == d)
+    for factory in FACTORIES:
+        prefix = f"{factory.__prefix__}:"
+        router.callback_query.register(noop, lambda c, p=prefix: c.data and c.data.startswith(p))
+    for text in TEXTS:
+        router.message.register(noop, F.text == text)
+    dp.include_router(router)
+    return dp
+
+
+def indexed_dispatcher() -> Dispatcher:
+    dp = Dispatcher()
+    index = RouteIndex()
+    for data in EXACT_CALLBACKS:
+        index.callback(data)(noop)
+    for factory in FACTORIES:
+        index.callback(factory)(noop)
+    index.text(*TEXTS)(noop)
+    dp.include_router(index.router)
+    return dp
+
+
+def make_updates() -> list[Update]:
+    user = User(id=1, is_bot=False, first_name="bench")
+    chat = Chat(id=1, type="private")
+    message = Message(message_id=1, date=datetime.now(), chat=chat, from_user=user, text="x")
+    updates = [
+        Update(update_id=i, callback_query=CallbackQuery(
+            id=str(i), from_user=user, chat_instance="bench", data=data, message=message,
+        ))
+        for i, data in enumerate(SAMPLES)
+    ]
+    updates += [
+        Update(update_id=100 + i, message=Message(
+            message_id=i, date=datetime.now(), chat=chat, from_user=user, text=text,
+        ))
+        for i, text in enumerate(TEXT_SAMPLES)
+    ]
+    return updates
+
+
+async def measure(dp: Dispatcher, bot: Bot, updates: list[Update], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for update in updates:
+            await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / (rounds * len(updates))
+
+
+async def main(rounds: int = 300) -> None:
+    bot = Bot(token="123456:bench")
+    updates = make_updates()
+    for name, dp in (("filter chain", legacy_dispatcher()), ("route index", indexed_dispatcher())):
+        await measure(dp, bot, updates, 10)
+        per_update = await measure(dp, bot, updates, rounds)
+        print(f"{name:>12}: {per_update * 1e6:8.1f} мкс / апдейт")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
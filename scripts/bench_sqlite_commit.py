@@ -0,0 +1,62 @@
+"""
+Пропускная способность commit-ов SQLite: профиль "default" (rollback journal,
+synchronous=FULL) против "production" (WAL, synchronous=NORMAL, см. db/engine.py).
+
+Каждая запись — отдельная транзакция, как UserRepo.create / SubscriptionRepo.create.
+Параллельно работают читатели, как хендлеры меню.
+
+Запуск: python -m scripts.bench_sqlite_commit
+"""
+import asyncio
+import os
+import tempfile
+import time
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from db.engine import build_engine
+from db.models import Base, User
+
+WRITERS = 4
+READERS = 8
+
+
+async def measure(profile: str, path: str, commits: int) -> tuple[float, int]:
+    engine = build_engine(f"sqlite+aiosqlite:///{path}", profile)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    done = asyncio.Event()
+    reads = 0
+
+    async def writer(offset: int) -> None:
+        for i in range(commits // WRITERS):
+            async with factory() as session:
+                session.add(User(telegram_id=offset * commits + i, full_name="bench"))
+                await session.commit()
+
+    async def reader() -> None:
+        nonlocal reads
+        while not done.is_set():
+            async with factory() as session:
+                await session.scalar(select(func.count(User.id)))
+            reads += 1
+
+    readers = [asyncio.create_task(reader()) for _ in range(READERS)]
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(n) for n in range(WRITERS)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*readers)
+    await engine.dispose()
+    return (commits // WRITERS * WRITERS) / elapsed, reads / elapsed
+
+
+async def main(commits: int = 2000) -> None:
+    for profile in ("default", "production"):
+        with tempfile.TemporaryDirectory() as tmp:
+            commits_per_sec, reads_per_sec = await measure(profile, os.path.join(tmp, "bench.db"), commits)
+        print(f"{profile:>10}: {commits_per_sec:8.0f} commit/с, {reads_per_sec:8.0f} чтений/с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
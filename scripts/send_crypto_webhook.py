@@ -0,0 +1,63 @@
+"""
+Локальная замена CryptoPay для проверки вебхука: отправляет подписанный
+invoice_paid на services/crypto_webhook.py запущенного бота.
+
+Инвойс должен существовать в payments (создан кнопкой оплаты), иначе
+выдачи не будет. Повторный запуск с тем же invoice_id проверяет идемпотентность.
+
+Запуск:
+    python -m scripts.send_crypto_webhook 123 "5:7d"
+    python -m scripts.send_crypto_webhook 124 "topup:5:10" --url http://127.0.0.1:8081/crypto-pay/webhook
+    python -m scripts.send_crypto_webhook 125 "vpn:5:fi" --bad-signature
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+import aiohttp
+from core.config import config
+from services.crypto_webhook import SIGNATURE_HEADER, sign
+
+
+def invoice_paid(invoice_id: int, payload: str) -> dict:
+    now = datetime.now(timezone.utc).isoformat()
+    return {
+        "update_id": int(time.time()),
+        "update_type": "invoice_paid",
+        "request_date": now,
+        "payload": {
+            "invoice_id": invoice_id,
+            "status": "paid",
+            "currency_type": "fiat",
+            "fiat": "USD",
+            "amount": "1.00",
+            "payload": payload,
+            "paid_at": now,
+        },
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("invoice_id", type=int)
+    parser.add_argument("payload", help='payload инвойса: "<user_id>:<tariff>", "topup:...", "vpn:..."')
+    parser.add_argument(
+        "--url",
+        default=f"http://127.0.0.1:{config.crypto_pay_webhook_port}{config.crypto_pay_webhook_path}",
+    )
+    parser.add_argument("--token", default=config.crypto_pay_token, help="токен CryptoPay для подписи")
+    parser.add_argument("--bad-signature", action="store_true", help="подписать чужим токеном (ожидается 401)")
+    args = parser.parse_args()
+
+    body = json.dumps(invoice_paid(args.invoice_id, args.payload)).encode()
+    token = args.token + "-wrong" if args.bad_signature else args.token
+    headers = {SIGNATURE_HEADER: sign(token, body), "Content-Type": "application/json"}
+
+    async with aiohttp.ClientSession() as session:
+        async with session.post(args.url, data=body, headers=headers) as resp:
+            print(f"{resp.status} {await resp.text()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from sqlalchemy.engine import make_url
+from core.config import config
+
+# Страниц за шаг backup API: между шагами исходная БД свободна для записи
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.01
+# После стольких перезапусков (БД меняется быстрее, чем копируется) — докопировать за один шаг
+MAX_RESTARTS = 5
+SNAPSHOT_PREFIX = "bot-"
+SNAPSHOT_SUFFIX = ".db.gz"
+
+
+@dataclass(frozen=True)
+class BackupResult:
+    path: Path
+    size: int
+    raw_size: int
+    duration: float
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+class SqliteBackup:
+    """
+    Онлайн-снимки SQLite через backup API: копирование небольшими шагами в отдельном
+    потоке, бот продолжает писать в БД. Снимки сжимаются gzip, хранятся последние `keep`.
+    """
+
+    def __init__(self, database_url: str, directory: str, keep: int):
+        url = make_url(database_url)
+        database = url.database if url.get_backend_name() == "sqlite" else None
+        self.database = database if database and database != ":memory:" else None
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.database is not None
+
+    async def snapshot(self) -> BackupResult:
+        if not self.available:
+            raise RuntimeError("Снимки доступны только для файловой SQLite")
+        async with self._lock:
+            started = time.monotonic()
+            path, raw_size = await asyncio.to_thread(self._snapshot)
+            result = BackupResult(
+                path=path,
+                size=path.stat().st_size,
+                raw_size=raw_size,
+                duration=time.monotonic() - started,
+            )
+            await asyncio.to_thread(self._rotate)
+        logging.info(
+            f"Снимок БД {result.path.name}: {result.size} байт "
+            f"(без сжатия {result.raw_size}), {result.duration:.1f} с"
+        )
+        return result
+
+    def _snapshot(self) -> tuple[Path, int]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{SNAPSHOT_PREFIX}{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+        raw_path = self.directory / f"{name}.db.tmp"
+        path = self.directory / f"{name}{SNAPSHOT_SUFFIX}"
+
+        source = sqlite3.connect(self.database)
+        target = sqlite3.connect(raw_path)
+        try:
+            try:
+                source.backup(target, pages=PAGES_PER_STEP, progress=self._progress())
+            except _TooManyRestarts:
+                source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        try:
+            raw_size = raw_path.stat().st_size
+            with open(raw_path, "rb") as raw, gzip.open(path, "wb", compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed)
+        finally:
+            os.remove(raw_path)
+        return path, raw_size
+
+    @staticmethod
+    def _progress():
+        state = {"remaining": None, "restarts": 0}
+
+        def progress(status: int, remaining: int, total: int) -> None:
+            # remaining вырос — исходную БД изменили, backup начался заново
+            if state["remaining"] is not None and remaining > state["remaining"]:
+                state["restarts"] += 1
+                if state["restarts"] > MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            state["remaining"] = remaining
+            time.sleep(STEP_PAUSE)
+
+        return progress
+
+    def _rotate(self) -> None:
+        snapshots = sorted(self.directory.glob(f"{SNAPSHOT_PREFIX}*{SNAPSHOT_SUFFIX}"))
+        for old in snapshots[:-self.keep] if self.keep > 0 else []:
+            old.unlink(missing_ok=True)
+
+
+backups = SqliteBackup(config.database_url, directory=config.backup_dir, keep=config.backup_keep)
@@ -1,18 +1,41 @@
 import asyncio
 import logging
+from typing import AsyncIterable, AsyncIterator
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from db.engine import AsyncSessionFactory
+from db.repository import UserRepo
 
+# Сколько telegram_id читается за один короткий запрос
+BATCH_SIZE = 500
 
-async def broadcast(bot: Bot, user_ids: list[int], text: str) -> tuple[int, int]:
+
+async def iter_telegram_ids(batch_size: int = BATCH_SIZE) -> AsyncIterator[int]:
+    """
+    telegram_id всех пользователей keyset-пачками. Сессия закрывается до того,
+    как пачка уходит в рассылку: отправка и паузы не держат курсор SQLite.
+    """
+    last_id = 0
+    while True:
+        async with AsyncSessionFactory() as session:
+            rows = await UserRepo(session).get_telegram_id_batch(last_id, batch_size)
+        for _, telegram_id in rows:
+            yield telegram_id
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1].id
+
+
+async def broadcast(bot: Bot, user_ids: AsyncIterable[int], text: str) -> tuple[int, int]:
     """
     Рассылает сообщение всем пользователям.
+    user_ids читаются пачками (iter_telegram_ids) — список всех пользователей в памяти не собирается.
     Возвращает (успешно, ошибок).
     """
     success = 0
     failed = 0
 
-    for user_id in user_ids:
+    async for user_id in user_ids:
         try:
             await bot.send_message(chat_id=user_id, text=text)
             success += 1
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import Iterable
+from db.models import GateChannel, ModChannel
+
+
+def channel_key(username: str) -> str:
+    """Нормализует username канала: нижний регистр, с @."""
+    username = username.lower()
+    return username if username.startswith("@") else f"@{username}"
+
+
+@dataclass(frozen=True)
+class GateChannelInfo:
+    id: int
+    username: str
+    title: str
+
+
+@dataclass(frozen=True)
+class ModChannelInfo:
+    id: int
+    username: str
+    title: str
+    url: str
+    is_private: bool
+    channel_id: int | None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    gate: tuple[GateChannelInfo, ...] = ()
+    mod: tuple[ModChannelInfo, ...] = ()
+    gate_keys: frozenset[str] = frozenset()
+
+
+class ChannelCatalog:
+    """
+    Неизменяемый снимок таблиц gate_channels и mod_channels в памяти.
+    Репозитории публикуют новый снимок после каждого add/remove,
+    горячие пути читают каналы без запросов в БД.
+    """
+
+    def __init__(self):
+        self._snapshot = CatalogSnapshot()
+
+    @property
+    def gate_channels(self) -> tuple[GateChannelInfo, ...]:
+        return self._snapshot.gate
+
+    @property
+    def mod_channels(self) -> tuple[ModChannelInfo, ...]:
+        return self._snapshot.mod
+
+    @property
+    def private_mod_channels(self) -> tuple[ModChannelInfo, ...]:
+        return tuple(ch for ch in self._snapshot.mod if ch.is_private)
+
+    def is_gate_channel(self, username: str) -> bool:
+        return channel_key(username) in self._snapshot.gate_keys
+
+    def publish_gate(self, channels: Iterable[GateChannel]) -> None:
+        gate = tuple(GateChannelInfo(id=ch.id, username=ch.username, title=ch.title) for ch in channels)
+        # Подмена ссылки на снимок атомарна — читатели видят либо старый, либо новый
+        self._snapshot = CatalogSnapshot(
+            gate=gate,
+            mod=self._snapshot.mod,
+            gate_keys=frozenset(channel_key(ch.username) for ch in gate),
+        )
+
+    def publish_mod(self, channels: Iterable[ModChannel]) -> None:
+        mod = tuple(
+            ModChannelInfo(
+                id=ch.id,
+                username=ch.username,
+                title=ch.title,
+                url=ch.url,
+                is_private=ch.is_private,
+                channel_id=ch.channel_id,
+            )
+            for ch in channels
+        )
+        self._snapshot = CatalogSnapshot(
+            gate=self._snapshot.gate,
+            mod=mod,
+            gate_keys=self._snapshot.gate_keys,
+        )
+
+    async def load(self) -> None:
+        """Перечитывает обе таблицы из БД (при старте)."""
+        from db.engine import AsyncSessionFactory
+        from db.repository import GateChannelRepo, ModChannelRepo
+
+        async with AsyncSessionFactory() as session:
+            self.publish_gate(await GateChannelRepo(session).get_all())
+            self.publish_mod(await ModChannelRepo(session).get_all())
+
+
+channel_catalog = ChannelCatalog()
@@ -1,12 +1,87 @@
+import asyncio
+import logging
+import math
+import time
 import aiohttp
 from core.config import config
 
+# Имя для paid_btn_url, пока getMe ни разу не ответил
+FALLBACK_APP_NAME = "bot"
+# Через сколько секунд повторить getMe после ошибки
+IDENTITY_RETRY = 60.0
+# Максимальный expires_in инвойса в CryptoPay API (31 день)
+MAX_INVOICE_TTL = 31 * 24 * 60 * 60
+
 
 class CryptoPayService:
+    """
+    Клиент CryptoPay API.
+
+    Держит одну долгоживущую ClientSession с пулом keep-alive соединений
+    и кэшем DNS: повторные вызовы не платят за резолв, TCP и TLS.
+    Сессия открывается в start() при запуске бота и закрывается в close(),
+    а если start() не вызывали (скрипты) — создаётся при первом запросе.
+
+    Имя приложения из getMe нужно каждому инвойсу, но не меняется:
+    оно запрашивается один раз (при старте или первом инвойсе) и хранится
+    identity_ttl секунд, одновременные инвойсы ждут один запрос.
+    """
+
     BASE_URL = config.crypto_pay_url
 
-    def __init__(self):
-        self.headers = {"Crypto-Pay-API-Token": config.crypto_pay_token}
+    def __init__(
+        self,
+        token: str = config.crypto_pay_token,
+        base_url: str | None = None,
+        connections: int = config.crypto_pay_connections,
+        keepalive: float = config.crypto_pay_keepalive,
+        dns_ttl: int = config.crypto_pay_dns_ttl,
+        timeout: float = config.crypto_pay_timeout,
+        identity_ttl: float = config.crypto_pay_identity_ttl,
+        invoice_ttl: int = config.archive_payments_after_days * 24 * 60 * 60,
+    ):
+        self.headers = {"Crypto-Pay-API-Token": token}
+        if base_url:
+            self.BASE_URL = base_url
+        self.connections = connections
+        self.keepalive = keepalive
+        self.dns_ttl = dns_ttl
+        self.timeout = timeout
+        self.identity_ttl = identity_ttl
+        # Инвойс истекает не позже, чем неоплаченную строку payments перенесут в архив
+        self.invoice_ttl = max(1, min(invoice_ttl, MAX_INVOICE_TTL))
+        self._session: aiohttp.ClientSession | None = None
+        self._app_name: str | None = None
+        self._app_name_expires = 0.0
+        self._app_name_lock = asyncio.Lock()
+        self._warmup: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._get_session()
+        # getMe — в фоне, чтобы недоступность CryptoPay не задерживала запуск
+        self._warmup = asyncio.create_task(self._get_bot_username())
+
+    async def close(self) -> None:
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connections,
+                limit_per_host=self.connections,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive,
+            )
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
 
     async def create_invoice(
         self,
@@ -24,10 +99,10 @@ class CryptoPayService:
             "payload": payload,
             "paid_btn_name": "callback",
             "paid_btn_url": f"https://t.me/{(await self._get_bot_username())}",
+            "expires_in": self.invoice_ttl,
         }
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(f"{self.BASE_URL}/createInvoice", json=params) as resp:
-                data = await resp.json()
+        async with self._get_session().post(f"{self.BASE_URL}/createInvoice", json=params) as resp:
+            data = await resp.json()
 
         if not data.get("ok"):
             raise RuntimeError(f"CryptoPay error: {data}")
@@ -36,16 +111,30 @@ class CryptoPayService:
 
     async def get_invoice(self, invoice_ids: list[str]) -> list[dict]:
         params = {"invoice_ids": ",".join(invoice_ids)}
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.get(f"{self.BASE_URL}/getInvoices", params=params) as resp:
-                data = await resp.json()
+        async with self._get_session().get(f"{self.BASE_URL}/getInvoices", params=params) as resp:
+            data = await resp.json()
         return data.get("result", {}).get("items", [])
 
     async def _get_bot_username(self) -> str:
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.get(f"{self.BASE_URL}/getMe") as resp:
-                data = await resp.json()
-        return data["result"].get("name", "bot")
+        if self._app_name is not None and time.monotonic() < self._app_name_expires:
+            return self._app_name
+        async with self._app_name_lock:
+            # Пока ждали лок, имя мог получить другой запрос
+            if self._app_name is not None and time.monotonic() < self._app_name_expires:
+                return self._app_name
+            try:
+                async with self._get_session().get(f"{self.BASE_URL}/getMe") as resp:
+                    data = await resp.json()
+                name = data["result"].get("name", FALLBACK_APP_NAME)
+            except Exception as e:
+                # Устаревшее имя лучше заглушки; инвойсы не ждут CryptoPay до IDENTITY_RETRY
+                logging.warning(f"CryptoPay getMe не ответил: {e}")
+                self._app_name = self._app_name or FALLBACK_APP_NAME
+                self._app_name_expires = time.monotonic() + IDENTITY_RETRY
+                return self._app_name
+            self._app_name = name
+            self._app_name_expires = time.monotonic() + self.identity_ttl if self.identity_ttl > 0 else math.inf
+            return name
 
 
-crypto_pay = CryptoPayService()
\ No newline at end of file
+crypto_pay = CryptoPayService()
@@ -0,0 +1,142 @@
+import hashlib
+import hmac
+import json
+import logging
+from aiogram import Bot
+from aiohttp import web
+from core.config import config
+from db.engine import AsyncSessionFactory
+from db.repository import UserRepo, SubscriptionRepo, PaymentRepo, BalanceRepo, PaidMark
+from handlers.payment import get_tariff, activate_paid_tariff, paid_tariff_text
+from handlers.topup import credit_paid_topup, paid_topup_text
+from handlers.vpn import VPN_CONFIGS
+from keyboards.vpn import get_server
+
+SIGNATURE_HEADER = "crypto-pay-api-signature"
+
+
+class InvoiceNotFound(Exception):
+    """Инвойса нет ни в payments, ни в архиве — выдавать нечего, пусть CryptoPay повторит."""
+
+
+def sign(token: str, body: bytes) -> str:
+    """Подпись CryptoPay: HMAC-SHA256 тела запроса, ключ — SHA256 от токена API."""
+    secret = hashlib.sha256(token.encode()).digest()
+    return hmac.new(secret, body, hashlib.sha256).hexdigest()
+
+
+class CryptoPayWebhook:
+    """
+    HTTP-приёмник вебхуков CryptoPay: invoice_paid выдаёт покупку сразу после оплаты,
+    не дожидаясь кнопки «✅ Проверить оплату».
+
+    Покупка определяется по payload инвойса (как его формируют хендлеры):
+    "<user_id>:<tariff>", "topup:<user_id>:<amount>", "vpn:<user_id>:<server>".
+    Выдача идемпотентна (PaymentRepo.mark_paid / BalanceRepo.credit по invoice_id):
+    повтор вебхука или гонка с кнопкой ничего не выдаст дважды.
+    На ошибку обработки отвечаем 500, на неизвестный инвойс — 503: CryptoPay повторит запрос.
+    """
+
+    def __init__(self, token: str, host: str, port: int, path: str):
+        self.token = token
+        self.host = host
+        self.port = port
+        self.path = path
+        self._bot: Bot | None = None
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.port > 0
+
+    def verify(self, body: bytes, signature: str | None) -> bool:
+        return bool(signature) and hmac.compare_digest(sign(self.token, body), signature)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def start(self, bot: Bot) -> None:
+        self._bot = bot
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logging.info(f"Вебхук CryptoPay слушает {self.host}:{self.port}{self.path}")
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self.verify(body, request.headers.get(SIGNATURE_HEADER)):
+            logging.warning(f"Вебхук CryptoPay с неверной подписью от {request.remote}")
+            return web.Response(status=401)
+        try:
+            update = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+
+        if update.get("update_type") != "invoice_paid":
+            return web.Response(text="ok")
+        try:
+            await self.process_paid(update.get("payload") or {})
+        except InvoiceNotFound as e:
+            logging.warning(f"Вебхук CryptoPay: инвойс {e} не найден, ждём повтора")
+            return web.Response(status=503)
+        except Exception as e:
+            logging.exception(f"Ошибка обработки вебхука CryptoPay {update.get('update_id')}: {e}")
+            return web.Response(status=500)
+        return web.Response(text="ok")
+
+    async def process_paid(self, invoice: dict) -> None:
+        invoice_id = str(invoice.get("invoice_id"))
+        parts = (invoice.get("payload") or "").split(":")
+
+        async with AsyncSessionFactory() as session:
+            pay_repo = PaymentRepo(session)
+            if len(parts) == 3 and parts[0] == "topup" and parts[1].isdigit():
+                user_id, raw_amount = int(parts[1]), parts[2]
+                amount = int(raw_amount) if raw_amount.isdigit() else float(raw_amount)
+                credited = await credit_paid_topup(invoice_id, user_id, amount, BalanceRepo(session), pay_repo)
+                # Зачисление идемпотентно по ref журнала и не зависит от строки payments
+                mark = PaidMark.UPDATED if credited is not None else PaidMark.ALREADY_PAID
+                messages = [paid_topup_text(amount, credited)] if credited is not None else []
+            elif len(parts) == 3 and parts[0] == "vpn" and parts[1].isdigit() and get_server(parts[2]):
+                user_id, server_id = int(parts[1]), parts[2]
+                mark = await pay_repo.mark_paid(invoice_id)
+                messages = [
+                    "✅ <b>Оплата прошла успешно!</b>\n\nВаш VPN конфиг готов 👇",
+                    VPN_CONFIGS.get(server_id, "⚠️ Конфиг не найден. Обратитесь к администратору."),
+                ] if mark is PaidMark.UPDATED else []
+            elif len(parts) == 2 and parts[0].isdigit() and get_tariff(parts[1]):
+                user_id, tariff = int(parts[0]), get_tariff(parts[1])
+                mark, sub = await activate_paid_tariff(invoice_id, user_id, tariff, SubscriptionRepo(session), pay_repo)
+                messages = [paid_tariff_text(tariff, sub)] if sub is not None else []
+            else:
+                logging.warning(f"Вебхук CryptoPay: неизвестный payload инвойса {invoice_id}: {invoice.get('payload')!r}")
+                return
+
+            if mark is PaidMark.NOT_FOUND:
+                raise InvoiceNotFound(invoice_id)
+            if not messages:
+                logging.info(f"Вебхук CryptoPay: инвойс {invoice_id} уже обработан")
+                return
+            telegram_id = await UserRepo(session).get_telegram_id(user_id)
+
+        # Покупка уже выдана — недоставленное сообщение не повод для повтора вебхука
+        try:
+            for text in messages:
+                await self._bot.send_message(chat_id=telegram_id, text=text)
+        except Exception as e:
+            logging.warning(f"Не удалось уведомить {telegram_id} об оплате {invoice_id}: {e}")
+
+
+crypto_webhook = CryptoPayWebhook(
+    token=config.crypto_pay_token,
+    host=config.crypto_pay_webhook_host,
+    port=config.crypto_pay_webhook_port,
+    path=config.crypto_pay_webhook_path,
+)
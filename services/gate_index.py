@@ -0,0 +1,76 @@
+import logging
+from typing import Iterable
+from aiogram import Bot
+from db.engine import AsyncSessionFactory
+from db.repository import GateMemberRepo
+from services.channel_catalog import GateChannelInfo, channel_key
+
+
+class GateMembershipIndex:
+    """
+    Индекс подписок на gate-каналы, который наполняется только chat_member апдейтами.
+    Хранится в памяти и дублируется в таблицу gate_members, чтобы пережить рестарт.
+
+    Записи не истекают, поэтому индексу верят лишь для каналов, где бот — администратор
+    и получает chat_member апдейты (выход из канала сразу попадает в индекс).
+    Для остальных каналов источник истины — TTL-кэш get_chat_member.
+    """
+
+    def __init__(self):
+        self._members: dict[tuple[str, int], bool] = {}
+        # Каналы, из которых точно приходят chat_member апдейты
+        self._trusted: set[str] = set()
+
+    async def load(self) -> None:
+        async with AsyncSessionFactory() as session:
+            rows = await GateMemberRepo(session).get_all()
+        self._members = {(row.channel, row.user_id): row.is_member for row in rows}
+        logging.info(f"Индекс gate-подписок загружен: {len(self._members)} записей")
+
+    async def verify_channels(self, bot: Bot, channels: Iterable[GateChannelInfo]) -> None:
+        """При старте: каналы, где бот администратор, — доверенные, из остальных индекс сбрасывается."""
+        for channel in channels:
+            try:
+                member = await bot.get_chat_member(chat_id=channel.username, user_id=bot.id)
+            except Exception as e:
+                logging.warning(f"Не удалось проверить права бота в {channel.username}: {e}")
+                continue
+            if member.status in ("administrator", "creator"):
+                self.trust_channel(channel.username)
+            else:
+                await self.forget_channel(channel.username)
+
+    def trust_channel(self, channel: str) -> None:
+        self._trusted.add(channel_key(channel))
+
+    def get(self, user_id: int, channel: str) -> bool | None:
+        """
+        Статус из индекса или None если канал не доверенный
+        или пользователь в этом канале ещё не встречался.
+        """
+        key = channel_key(channel)
+        if key not in self._trusted:
+            return None
+        return self._members.get((key, user_id))
+
+    async def update(self, user_id: int, channel: str, is_member: bool) -> None:
+        key = (channel_key(channel), user_id)
+        if self._members.get(key) == is_member:
+            return
+        self._members[key] = is_member
+        try:
+            async with AsyncSessionFactory() as session:
+                await GateMemberRepo(session).upsert(key[0], user_id, is_member)
+        except Exception as e:
+            logging.warning(f"Не удалось сохранить статус {user_id} в {key[0]}: {e}")
+
+    async def forget_channel(self, channel: str) -> None:
+        """Сбрасывает канал — апдейты из него больше не приходят, индекс устарел бы."""
+        key = channel_key(channel)
+        self._trusted.discard(key)
+        self._members = {k: v for k, v in self._members.items() if k[0] != key}
+        async with AsyncSessionFactory() as session:
+            await GateMemberRepo(session).remove_channel(key)
+
+
+gate_index = GateMembershipIndex()
@@ -0,0 +1,221 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import GetUpdates
+from aiogram.types import Update
+from aiogram.utils.backoff import Backoff, BackoffConfig
+from core.config import config
+from keyboards.callbacks import is_payment_callback
+
+POLLING_TIMEOUT = 30
+
+
+@dataclass(frozen=True)
+class IngressStats:
+    depth: int
+    low_depth: int
+    oldest_age: float
+    processed: int
+    shed_stale: int
+    shed_overflow: int
+
+
+@dataclass
+class _Item:
+    update: Update
+    received_at: float
+    key: tuple | None
+    high: bool
+    owner: tuple
+
+
+class IngressQueue:
+    """
+    Входная очередь апдейтов перед диспетчером.
+
+    У каждого пользователя (пары чат + пользователь, как у лока UserEventIsolation)
+    своя FIFO-очередь, воркеру выдаётся только голова очереди пользователя,
+    которого сейчас никто не обрабатывает. Так порядок апдейтов пользователя
+    сохраняется, а его хвост ждёт в очереди, не занимая воркеров: один медленный
+    хендлер не держит остальных пользователей.
+    Платежи, админы и служебные апдейты (chat_member) — высокий приоритет,
+    они не отбрасываются никогда. Остальных в очереди не больше max_queue:
+    при переполнении вытесняется самый старый, а взятый из очереди после дедлайна
+    отбрасывается (пользователь уже не ждёт ответа на эту кнопку).
+    Повторное нажатие той же кнопки, пока первое ещё в очереди, — низкий приоритет.
+    """
+
+    def __init__(self, max_queue: int, deadline: float, workers: int):
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.workers = workers
+        self._queues: dict[tuple, deque[_Item]] = {}
+        # Пользователи, чью голову очереди можно отдать воркеру; пустые и занятые пропускаются
+        self._runnable: deque[tuple] = deque()
+        self._busy: set[tuple] = set()
+        self._depth = 0
+        self._low_count = 0
+        self._pending: Counter[tuple] = Counter()
+        self._ready = asyncio.Event()
+        self.processed = 0
+        self.shed_stale = 0
+        self.shed_overflow = 0
+
+    def stats(self) -> IngressStats:
+        heads = [queue[0].received_at for queue in self._queues.values() if queue]
+        return IngressStats(
+            depth=self._depth,
+            low_depth=self._low_count,
+            oldest_age=time.monotonic() - min(heads) if heads else 0.0,
+            processed=self.processed,
+            shed_stale=self.shed_stale,
+            shed_overflow=self.shed_overflow,
+        )
+
+    @staticmethod
+    def _classify(update: Update) -> tuple[tuple | None, bool]:
+        """Ключ для поиска дублей и признак высокого приоритета."""
+        if update.callback_query:
+            user_id = update.callback_query.from_user.id
+            data = update.callback_query.data or ""
+            return (user_id, "callback", data), user_id in config.admin_ids or is_payment_callback(data)
+        if update.message and update.message.from_user:
+            user_id = update.message.from_user.id
+            return (user_id, "message", update.message.text), user_id in config.admin_ids
+        return None, True
+
+    @staticmethod
+    def _owner(update: Update) -> tuple:
+        """Чей апдейт: тот же ключ (чат, пользователь), что у лока UserEventIsolation."""
+        context = UserContextMiddleware.resolve_event_context(update)
+        chat_id = context.chat.id if context.chat else None
+        user_id = context.user.id if context.user else None
+        if chat_id is None and user_id is None:
+            # Апдейт без пользователя ни с чем не упорядочивается
+            return ("update", update.update_id)
+        return chat_id, user_id
+
+    def put(self, update: Update) -> None:
+        key, high = self._classify(update)
+        if key is not None:
+            if self._pending[key]:
+                high = False
+            self._pending[key] += 1
+        if not high:
+            if self._low_count >= self.max_queue:
+                self._evict_oldest_low()
+            self._low_count += 1
+
+        item = _Item(update=update, received_at=time.monotonic(), key=key, high=high, owner=self._owner(update))
+        queue = self._queues.setdefault(item.owner, deque())
+        queue.append(item)
+        self._depth += 1
+        if len(queue) == 1 and item.owner not in self._busy:
+            self._runnable.append(item.owner)
+            self._ready.set()
+
+    def _evict_oldest_low(self) -> None:
+        # Только при переполнении: полный проход по очередям дешевле, чем держать общий индекс
+        oldest = min(
+            (item for queue in self._queues.values() for item in queue if not item.high),
+            key=lambda item: item.received_at,
+            default=None,
+        )
+        if oldest is None:
+            return
+        self._queues[oldest.owner].remove(oldest)
+        self._release(oldest)
+        self.shed_overflow += 1
+
+    def _release(self, item: _Item) -> None:
+        self._depth -= 1
+        if not item.high:
+            self._low_count -= 1
+        if item.key is None:
+            return
+        self._pending[item.key] -= 1
+        if not self._pending[item.key]:
+            del self._pending[item.key]
+
+    async def _next(self) -> _Item:
+        while True:
+            if not self._runnable:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            owner = self._runnable.popleft()
+            queue = self._queues.get(owner)
+            if owner in self._busy or queue is None:
+                continue
+            while queue:
+                item = queue.popleft()
+                self._release(item)
+                if not item.high and time.monotonic() - item.received_at > self.deadline:
+                    self.shed_stale += 1
+                    continue
+                self._busy.add(owner)
+                return item
+            del self._queues[owner]
+
+    def _done(self, owner: tuple) -> None:
+        """Апдейт обработан: следующий апдейт пользователя можно отдать воркеру."""
+        self._busy.discard(owner)
+        if self._queues.get(owner):
+            self._runnable.append(owner)
+            self._ready.set()
+        else:
+            self._queues.pop(owner, None)
+
+    async def _worker(self, bot: Bot, dp: Dispatcher) -> None:
+        while True:
+            item = await self._next()
+            try:
+                await dp.feed_update(bot, item.update)
+            except Exception as e:
+                logging.exception(f"Ошибка обработки апдейта {item.update.update_id}: {e}")
+            finally:
+                self.processed += 1
+                self._done(item.owner)
+
+    async def run_polling(self, bot: Bot, dp: Dispatcher) -> None:
+        """Long polling: складывает апдейты в очередь, воркеры отдают их диспетчеру."""
+        allowed_updates = dp.resolve_used_update_types()
+        backoff = Backoff(config=BackoffConfig(min_delay=1.0, max_delay=5.0, factor=1.3, jitter=0.1))
+        workers = [asyncio.create_task(self._worker(bot, dp)) for _ in range(self.workers)]
+        offset = None
+
+        await dp.emit_startup(bot=bot, dispatcher=dp, **dp.workflow_data)
+        try:
+            while True:
+                try:
+                    updates = await bot(
+                        GetUpdates(offset=offset, timeout=POLLING_TIMEOUT, allowed_updates=allowed_updates),
+                        request_timeout=POLLING_TIMEOUT + 10,
+                    )
+                except Exception as e:
+                    logging.error(f"Ошибка получения апдейтов: {e}")
+                    await backoff.asleep()
+                    continue
+                backoff.reset()
+                for update in updates:
+                    offset = update.update_id + 1
+                    self.put(update)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            try:
+                await dp.emit_shutdown(bot=bot, dispatcher=dp, **dp.workflow_data)
+            finally:
+                # Как в Dispatcher.start_polling: HTTP-сессия бота закрывается вместе с поллингом
+                await bot.session.close()
+
+
+ingress = IngressQueue(
+    max_queue=config.ingress_max_queue,
+    deadline=config.ingress_deadline,
+    workers=config.ingress_workers,
+)
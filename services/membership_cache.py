@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from core.config import config
+
+
+class MembershipCache:
+    """
+    LRU-кэш результатов get_chat_member по паре (user_id, канал).
+    Положительные и отрицательные ответы живут разное время,
+    ошибки уровня канала (бот удалён, неверный username) кэшируются отдельно.
+    """
+
+    def __init__(
+        self,
+        member_ttl: float,
+        non_member_ttl: float,
+        channel_error_ttl: float,
+        max_size: int,
+    ):
+        self.member_ttl = member_ttl
+        self.non_member_ttl = non_member_ttl
+        self.channel_error_ttl = channel_error_ttl
+        self.max_size = max_size
+        self._members: OrderedDict[tuple[int, str], tuple[bool, float]] = OrderedDict()
+        self._channel_errors: dict[str, float] = {}
+
+    @staticmethod
+    def _channel_key(username: str) -> str:
+        return username.lower()
+
+    def get(self, user_id: int, channel: str) -> bool | None:
+        """Возвращает закэшированный статус или None если записи нет / она протухла."""
+        key = (user_id, self._channel_key(channel))
+        entry = self._members.get(key)
+        if entry is None:
+            return None
+        is_member, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._members[key]
+            return None
+        self._members.move_to_end(key)
+        return is_member
+
+    def set(self, user_id: int, channel: str, is_member: bool) -> None:
+        ttl = self.member_ttl if is_member else self.non_member_ttl
+        if ttl <= 0:
+            return
+        key = (user_id, self._channel_key(channel))
+        self._members[key] = (is_member, time.monotonic() + ttl)
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    def is_channel_broken(self, channel: str) -> bool:
+        key = self._channel_key(channel)
+        expires_at = self._channel_errors.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._channel_errors[key]
+            return False
+        return True
+
+    def mark_channel_broken(self, channel: str) -> None:
+        if self.channel_error_ttl <= 0:
+            return
+        self._channel_errors[self._channel_key(channel)] = time.monotonic() + self.channel_error_ttl
+
+    def clear(self) -> None:
+        self._members.clear()
+        self._channel_errors.clear()
+
+
+membership_cache = MembershipCache(
+    member_ttl=config.gate_cache_member_ttl,
+    non_member_ttl=config.gate_cache_non_member_ttl,
+    channel_error_ttl=config.gate_cache_channel_error_ttl,
+    max_size=config.gate_cache_max_size,
+)
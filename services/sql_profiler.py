@@ -0,0 +1,133 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from core.config import config
+
+logger = logging.getLogger("sql_profiler")
+
+# Сколько раз один и тот же SQL должен повториться за апдейт, чтобы считаться N+1
+REPEAT_THRESHOLD = 3
+# Длина текста запроса в логе
+STATEMENT_PREVIEW = 300
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class UpdateProfile:
+    """Запросы, выполненные за один апдейт."""
+    update_id: int | None
+    handler: str | None = None
+    queries: int = 0
+    total_time: float = 0.0
+    # Текст запроса без параметров -> сколько раз выполнен
+    statements: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def label(self) -> str:
+        return f"update {self.update_id}, {self.handler or 'без хендлера'}"
+
+
+_current: ContextVar[UpdateProfile | None] = ContextVar("sql_profile", default=None)
+
+
+def _preview(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:STATEMENT_PREVIEW]
+
+
+class SqlProfiler:
+    """
+    Счётчик SQL-запросов по апдейтам на событиях движка SQLAlchemy.
+
+    Апдейт открывает профиль (см. middlewares/profiler.py), каждый запрос
+    внутри него добавляет время и текст. Медленные запросы логируются сразу,
+    превышение бюджета и повторы одного запроса (N+1) — по завершении апдейта.
+    Выключенный профилировщик не вешает слушателей и middleware.
+    """
+
+    def __init__(self, enabled: bool, slow_query_ms: float, query_budget: int):
+        self.enabled = enabled
+        self.slow_query = slow_query_ms / 1000
+        self.query_budget = query_budget
+        self.slow_queries = 0
+        self.over_budget = 0
+
+    def install(self, engine: AsyncEngine) -> None:
+        if not self.enabled:
+            return
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+        logger.info(
+            f"Профилировщик SQL включён: медленный запрос от {self.slow_query * 1000:.0f} мс, "
+            f"бюджет {self.query_budget} запросов на апдейт"
+        )
+
+    @contextmanager
+    def profile(self, update_id: int | None) -> Iterator[UpdateProfile]:
+        profile = UpdateProfile(update_id=update_id)
+        token = _current.set(profile)
+        try:
+            yield profile
+        finally:
+            _current.reset(token)
+            self._report(profile)
+
+    @staticmethod
+    def set_handler(name: str) -> None:
+        profile = _current.get()
+        if profile is not None and profile.handler is None:
+            profile.handler = name
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        # Время старта — на контексте выполнения, а не на соединении: если запрос упадёт,
+        # after_cursor_execute не вызовется, и на соединении из пула осталась бы лишняя запись
+        context.sql_profiler_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = getattr(context, "sql_profiler_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        profile = _current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.total_time += elapsed
+            profile.statements[statement] += 1
+        if elapsed >= self.slow_query:
+            self.slow_queries += 1
+            where = profile.label if profile else "фоновая задача"
+            logger.warning(f"Медленный запрос {elapsed * 1000:.1f} мс [{where}]: {_preview(statement)}")
+
+    def _report(self, profile: UpdateProfile) -> None:
+        if not profile.queries:
+            return
+        summary = f"{profile.queries} запросов за {profile.total_time * 1000:.1f} мс [{profile.label}]"
+        if profile.queries <= self.query_budget:
+            logger.debug(summary)
+            return
+
+        self.over_budget += 1
+        repeated = [
+            f"  ×{count}: {_preview(statement)}"
+            for statement, count in profile.statements.most_common()
+            if count >= REPEAT_THRESHOLD
+        ]
+        if repeated:
+            logger.warning(f"Бюджет {self.query_budget} превышен, возможен N+1: {summary}\n" + "\n".join(repeated))
+        else:
+            logger.warning(f"Бюджет {self.query_budget} превышен: {summary}")
+
+
+sql_profiler = SqlProfiler(
+    enabled=config.sql_profiler,
+    slow_query_ms=config.sql_slow_query_ms,
+    query_budget=config.sql_query_budget,
+)
@@ -0,0 +1,49 @@
+import logging
+from datetime import datetime
+from db.engine import AsyncSessionFactory
+
+
+class ActiveSubscriptionIndex:
+    """
+    user_id -> самый поздний expires_at активной подписки.
+    Отвечает на «есть ли доступ и до когда» без запроса в БД. Наполняется при старте
+    из users.active_until и обновляется в SubscriptionRepo.create / deactivate_all;
+    истёкшие записи удаляются при обращении. История подписок по-прежнему только в БД.
+    """
+
+    def __init__(self):
+        self._expires: dict[int, datetime] = {}
+
+    async def load(self) -> None:
+        from db.repository import UserRepo
+
+        expires: dict[int, datetime] = {}
+        async with AsyncSessionFactory() as session:
+            async for user_id, expires_at in UserRepo(session).stream_active_until():
+                expires[user_id] = expires_at
+        self._expires = expires
+        logging.info(f"Индекс активных подписок загружен: {len(self._expires)} пользователей")
+
+    def get(self, user_id: int) -> datetime | None:
+        """expires_at активной подписки или None если доступа нет."""
+        expires_at = self._expires.get(user_id)
+        if expires_at is None:
+            return None
+        if expires_at <= datetime.utcnow():
+            del self._expires[user_id]
+            return None
+        return expires_at
+
+    def extend(self, user_id: int, expires_at: datetime) -> None:
+        current = self._expires.get(user_id)
+        if current is None or expires_at > current:
+            self._expires[user_id] = expires_at
+
+    def remove(self, user_id: int) -> None:
+        self._expires.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+
+active_subscriptions = ActiveSubscriptionIndex()
@@ -0,0 +1,47 @@
+import asyncio
+from core.config import config
+from db.engine import AsyncSessionFactory
+
+
+class UserInsertBatcher:
+    """
+    Склеивает вставки новых пользователей из параллельных апдейтов в одну транзакцию.
+    Первая вставка открывает окно `window` секунд, все вставки за это время
+    уходят одним INSERT ... ON CONFLICT DO NOTHING и одним commit-ом.
+    Повторная вставка того же telegram_id в окне не дублирует строку.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._batch: dict[int, tuple[str, str | None]] | None = None
+        self._done: asyncio.Future | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def insert(self, telegram_id: int, full_name: str, username: str | None) -> None:
+        if self._batch is None:
+            self._batch = {}
+            self._done = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self._flush_later(self._batch, self._done))
+        self._batch.setdefault(telegram_id, (full_name, username))
+        # shield: отмена одного апдейта не должна отменять вставку остальных
+        await asyncio.shield(self._done)
+
+    async def _flush_later(self, batch: dict[int, tuple[str, str | None]], done: asyncio.Future) -> None:
+        from db.repository import UserRepo
+
+        await asyncio.sleep(self.window)
+        self._batch = None
+        self._done = None
+        try:
+            async with AsyncSessionFactory() as session:
+                await UserRepo(session).insert_many(batch)
+        except Exception as e:
+            done.set_exception(e)
+        else:
+            done.set_result(None)
+
+
+user_batcher = UserInsertBatcher(window=config.user_insert_batch_window)
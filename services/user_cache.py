@@ -0,0 +1,84 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from core.config import config
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    telegram_id: int
+    balance_minor: int
+    sub_count: int
+
+
+class UserCache:
+    """
+    LRU-кэш снимков строк users по telegram_id перед UserRepo.
+    Баланс обновляется сквозной записью из BalanceRepo, изменения подписок
+    сбрасывают снимок. TTL ограничивает расхождение с БД при правках извне.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._users: OrderedDict[int, tuple[UserSnapshot, float]] = OrderedDict()
+        # users.id -> telegram_id: репозитории баланса и подписок знают только id
+        self._telegram_ids: dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int) -> UserSnapshot | None:
+        entry = self._users.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        snapshot, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._drop(telegram_id)
+            self.misses += 1
+            return None
+        self._users.move_to_end(telegram_id)
+        self.hits += 1
+        return snapshot
+
+    def put(self, snapshot: UserSnapshot) -> None:
+        if self.ttl <= 0:
+            return
+        self._users[snapshot.telegram_id] = (snapshot, time.monotonic() + self.ttl)
+        self._users.move_to_end(snapshot.telegram_id)
+        self._telegram_ids[snapshot.id] = snapshot.telegram_id
+        while len(self._users) > self.max_size:
+            telegram_id, (evicted, _) = self._users.popitem(last=False)
+            self._telegram_ids.pop(evicted.id, None)
+
+    def update(self, user_id: int, **changes) -> None:
+        """Сквозная запись: меняет поля снимка, если он в кэше. TTL не продлевается."""
+        telegram_id = self._telegram_ids.get(user_id)
+        if telegram_id is None:
+            return
+        snapshot, expires_at = self._users[telegram_id]
+        self._users[telegram_id] = (replace(snapshot, **changes), expires_at)
+
+    def forget(self, user_id: int) -> None:
+        telegram_id = self._telegram_ids.get(user_id)
+        if telegram_id is not None:
+            self._drop(telegram_id)
+
+    def _drop(self, telegram_id: int) -> None:
+        snapshot, _ = self._users.pop(telegram_id)
+        self._telegram_ids.pop(snapshot.id, None)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._telegram_ids.clear()
+
+
+user_cache = UserCache(ttl=config.user_cache_ttl, max_size=config.user_cache_max_size)
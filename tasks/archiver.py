@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from core.config import config
+from db.engine import AsyncSessionFactory
+from db.repository import ArchiveRepo
+
+# Пауза между пачками, чтобы не держать запись в БД подряд
+BATCH_PAUSE = 0.5
+
+
+async def _archive(move, cutoff: datetime) -> int:
+    total = 0
+    while True:
+        async with AsyncSessionFactory() as session:
+            moved = await move(ArchiveRepo(session), cutoff, config.archive_batch_size)
+        total += moved
+        if moved < config.archive_batch_size:
+            return total
+        await asyncio.sleep(BATCH_PAUSE)
+
+
+async def archive_stale_rows() -> None:
+    """Переносит неактивные подписки и брошенные инвойсы в архивные таблицы."""
+    now = datetime.utcnow()
+    subs = await _archive(
+        ArchiveRepo.archive_subscriptions,
+        now - timedelta(days=config.archive_subscriptions_after_days),
+    )
+    payments = await _archive(
+        ArchiveRepo.archive_payments,
+        now - timedelta(days=config.archive_payments_after_days),
+    )
+    logging.info(f"Архивация завершена. Подписок: {subs}, платежей: {payments}")
+
+
+async def run_archiver() -> None:
+    """Фоновая задача — архивация раз в config.archive_interval секунд."""
+    logging.info("Запущена фоновая архивация")
+    while True:
+        try:
+            await archive_stale_rows()
+        except Exception as e:
+            logging.error(f"Ошибка в archiver: {e}")
+        await asyncio.sleep(config.archive_interval)
@@ -0,0 +1,15 @@
+import asyncio
+import logging
+from core.config import config
+from services.backup import backups
+
+
+async def run_backups() -> None:
+    """Фоновая задача — снимок SQLite раз в config.backup_interval секунд."""
+    logging.info("Запущено резервное копирование БД")
+    while True:
+        await asyncio.sleep(config.backup_interval)
+        try:
+            await backups.snapshot()
+        except Exception as e:
+            logging.error(f"Ошибка в backup: {e}")
@@ -0,0 +1,15 @@
+import asyncio
+import logging
+from core.config import config
+from db.engine import sqlite_maintenance
+
+
+async def run_db_maintenance() -> None:
+    """Фоновая задача — периодический checkpoint WAL и optimize для SQLite."""
+    logging.info("Запущено обслуживание SQLite")
+    while True:
+        await asyncio.sleep(config.sqlite_maintenance_interval)
+        try:
+            await sqlite_maintenance()
+        except Exception as e:
+            logging.error(f"Ошибка в db_maintenance: {e}")
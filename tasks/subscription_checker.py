@@ -3,94 +3,95 @@ import logging
 from datetime import datetime, timedelta
 from aiogram import Bot
 from db.engine import AsyncSessionFactory
-from db.models import User, Subscription
+from db.repository import SubscriptionRepo
 from services.channel import kick_user_from_channel, is_user_in_channel
-from sqlalchemy import select
+from services.subscription_index import active_subscriptions
+
+# Сколько истёкших подписок обрабатывается и деактивируется за один commit
+EXPIRED_BATCH_SIZE = 500
+# Сколько истекающих подписок читается за один запрос перед уведомлениями
+EXPIRING_BATCH_SIZE = 500
 
 
 async def notify_expiring_soon(bot: Bot) -> None:
     """Уведомляет пользователей за 24 часа до истечения подписки."""
-    async with AsyncSessionFactory() as session:
-        now = datetime.utcnow()
-        soon = now + timedelta(hours=24)
-
-        result = await session.execute(
-            select(Subscription, User)
-            .join(User, User.id == Subscription.user_id)
-            .where(
-                Subscription.is_active == True,
-                Subscription.expires_at > now,
-                Subscription.expires_at <= soon,
-            )
-        )
-        rows = result.all()
-
-    for sub, user in rows:
-        try:
-            await bot.send_message(
-                chat_id=user.telegram_id,
-                text=(
-                    f"⚠️ <b>Внимание!</b>\n\n"
-                    f"Ваша подписка истекает <b>{sub.expires_at.strftime('%d.%m.%Y в %H:%M')}</b>.\n\n"
-                    f"Продлите подписку через <b>🛒 Купить подписку</b> чтобы не потерять доступ."
+    now = datetime.utcnow()
+    soon = now + timedelta(hours=24)
+
+    last_id = 0
+    while True:
+        # Пачка читается короткой сессией, уведомления шлются уже без открытого курсора
+        async with AsyncSessionFactory() as session:
+            rows = await SubscriptionRepo(session).get_expiring_batch(now, soon, last_id, EXPIRING_BATCH_SIZE)
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for _, telegram_id, expires_at in rows:
+            try:
+                await bot.send_message(
+                    chat_id=telegram_id,
+                    text=(
+                        f"⚠️ <b>Внимание!</b>\n\n"
+                        f"Ваша подписка истекает <b>{expires_at.strftime('%d.%m.%Y в %H:%M')}</b>.\n\n"
+                        f"Продлите подписку через <b>🛒 Купить подписку</b> чтобы не потерять доступ."
+                    )
                 )
-            )
-        except Exception as e:
-            logging.warning(f"Не удалось уведомить {user.telegram_id}: {e}")
+            except Exception as e:
+                logging.warning(f"Не удалось уведомить {telegram_id}: {e}")
 
 
 async def kick_expired_users(bot: Bot) -> None:
     """Кикает пользователей с истёкшей подпиской из приватных мод-каналов."""
+    now = datetime.utcnow()
+    processed = 0
+
     async with AsyncSessionFactory() as session:
-        now = datetime.utcnow()
-
-        result = await session.execute(
-            select(Subscription, User)
-            .join(User, User.id == Subscription.user_id)
-            .where(
-                Subscription.is_active == True,
-                Subscription.expires_at <= now,
-            )
-        )
-        rows = result.all()
-
-        # Получаем приватные мод-каналы
-        from db.repository import ModChannelRepo
-        mod_repo = ModChannelRepo(session)
-        private_channels = await mod_repo.get_private_channels()
-
-        for sub, user in rows:
-            sub.is_active = False
-
-            if not private_channels:
-                continue
-
-            for ch in private_channels:
-                if not ch.channel_id:
-                    continue
-
-                in_channel = await is_user_in_channel(bot, user.telegram_id, ch.channel_id)
-
-                if in_channel:
-                    kicked = await kick_user_from_channel(bot, user.telegram_id, ch.channel_id)
-
-                    if kicked:
-                        try:
-                            await bot.send_message(
-                                chat_id=user.telegram_id,
-                                text=(
-                                    "🔒 <b>Подписка истекла</b>\n\n"
-                                    f"Ваш доступ к каналу <b>{ch.title}</b> закрыт.\n\n"
-                                    "Чтобы восстановить доступ — оформите новую подписку "
-                                    "через <b>🛒 Купить подписку</b>."
-                                )
-                            )
-                        except Exception as e:
-                            logging.warning(f"Не удалось уведомить {user.telegram_id}: {e}")
-
-        await session.commit()
-
-    logging.info(f"Проверка подписок завершена. Обработано: {len(rows)}")
+        repo = SubscriptionRepo(session)
+        while True:
+            rows = await repo.get_expired_batch(now, EXPIRED_BATCH_SIZE)
+            if not rows:
+                break
+            processed += len(rows)
+
+            # Пользователь с продлённой (цепочкой) подпиской доступ не теряет
+            telegram_ids = {
+                telegram_id for _, user_id, telegram_id in rows
+                if active_subscriptions.get(user_id) is None
+            }
+            for telegram_id in telegram_ids:
+                await _kick_from_private_channels(bot, telegram_id)
+
+            await repo.deactivate([sub_id for sub_id, _, _ in rows])
+
+    logging.info(f"Проверка подписок завершена. Обработано: {processed}")
+
+
+async def _kick_from_private_channels(bot: Bot, telegram_id: int) -> None:
+    from services.channel_catalog import channel_catalog
+
+    for ch in channel_catalog.private_mod_channels:
+        if not ch.channel_id:
+            continue
+
+        in_channel = await is_user_in_channel(bot, telegram_id, ch.channel_id)
+
+        if in_channel:
+            kicked = await kick_user_from_channel(bot, telegram_id, ch.channel_id)
+
+            if kicked:
+                try:
+                    await bot.send_message(
+                        chat_id=telegram_id,
+                        text=(
+                            "🔒 <b>Подписка истекла</b>\n\n"
+                            f"Ваш доступ к каналу <b>{ch.title}</b> закрыт.\n\n"
+                            "Чтобы восстановить доступ — оформите новую подписку "
+                            "через <b>🛒 Купить подписку</b>."
+                        )
+                    )
+                except Exception as e:
+                    logging.warning(f"Не удалось уведомить {telegram_id}: {e}")
 
 
 async def run_subscription_checker(bot: Bot) -> None:
@@ -0,0 +1,34 @@
+from sqlalchemy import func, select
+from db.models import BalanceEntry, User
+from db.repository import BalanceRepo
+
+
+def balance_and_entries(db, user_id: int) -> tuple[int, int]:
+    balance = db.run(db.scalar(select(User.balance_minor).where(User.id == user_id)))
+    entries = db.run(db.scalar(select(func.count()).select_from(BalanceEntry)))
+    return balance, entries
+
+
+def test_credit_same_ref_twice_credits_once(db):
+    user_id = db.run(db.create_user())
+
+    async def credit() -> bool:
+        async with db.factory() as session:
+            return await BalanceRepo(session).credit(user_id, 50_000, "topup", ref="inv-1")
+
+    assert db.run(credit()) is True
+    assert db.run(credit()) is False
+    assert balance_and_entries(db, user_id) == (50_000, 1)
+
+
+def test_debit_over_balance_changes_nothing(db):
+    user_id = db.run(db.create_user())
+
+    async def spend() -> tuple[int | None, int | None]:
+        async with db.factory() as session:
+            repo = BalanceRepo(session)
+            await repo.credit(user_id, 10_000, "topup", ref="inv-1")
+            return await repo.debit(user_id, 10_001, "vpn"), await repo.debit(user_id, 4_000, "vpn")
+
+    assert db.run(spend()) == (None, 6_000)
+    assert balance_and_entries(db, user_id) == (6_000, 2)
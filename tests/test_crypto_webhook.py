@@ -0,0 +1,137 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import func, select
+from db.models import BalanceEntry, Payment, PaymentArchive, Subscription, User
+from db.repository import ArchiveRepo, BalanceRepo, PaidMark, PaymentRepo, SubscriptionRepo
+from handlers.payment import activate_paid_tariff, get_tariff
+from handlers.topup import credit_paid_topup
+from scripts.send_crypto_webhook import invoice_paid
+from services import crypto_webhook as webhook_module
+from services.crypto_webhook import SIGNATURE_HEADER, CryptoPayWebhook, InvoiceNotFound, sign
+
+TOKEN = "test"
+TELEGRAM_ID = 1000
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def webhook(db, monkeypatch) -> CryptoPayWebhook:
+    # process_paid открывает сессии сам — подменяем фабрику модуля на тестовую БД
+    monkeypatch.setattr(webhook_module, "AsyncSessionFactory", db.factory)
+    hook = CryptoPayWebhook(token=TOKEN, host="127.0.0.1", port=0, path="/hook")
+    hook._bot = FakeBot()
+    return hook
+
+
+def create_payment(db, invoice_id: str, tariff_id: str, amount: float) -> int:
+    async def create() -> int:
+        user_id = await db.create_user(TELEGRAM_ID)
+        async with db.factory() as session:
+            await PaymentRepo(session).create(user_id, invoice_id, tariff_id, amount)
+        return user_id
+
+    return db.run(create())
+
+
+def signed(payload: dict, token: str = TOKEN) -> tuple[bytes, dict]:
+    body = json.dumps(payload).encode()
+    return body, {SIGNATURE_HEADER: sign(token, body), "Content-Type": "application/json"}
+
+
+def test_webhook_races_button_click_for_tariff(db, webhook):
+    user_id = create_payment(db, "101", "7d", 0.39)
+
+    async def button():
+        async with db.factory() as session:
+            return await activate_paid_tariff(
+                "101", user_id, get_tariff("7d"), SubscriptionRepo(session), PaymentRepo(session)
+            )
+
+    async def race():
+        return await asyncio.gather(
+            webhook.process_paid({"invoice_id": 101, "payload": f"{user_id}:7d"}),
+            button(),
+        )
+
+    _, (mark, sub) = db.run(race())
+    assert db.run(db.scalar(select(func.count()).select_from(Subscription))) == 1
+    assert db.run(db.scalar(select(User.sub_count).where(User.id == user_id))) == 1
+    assert db.run(db.scalar(select(Payment.is_paid).where(Payment.invoice_id == "101"))) is True
+    # Подписку выдаёт ровно одна сторона: либо кнопка, либо вебхук
+    button_won = mark is PaidMark.UPDATED
+    assert (sub is not None) == button_won
+    assert len(webhook._bot.sent) == (0 if button_won else 1)
+
+
+def test_webhook_races_button_click_for_topup(db, webhook):
+    user_id = create_payment(db, "102", "topup", 10)
+
+    async def button():
+        async with db.factory() as session:
+            return await credit_paid_topup("102", user_id, 10, BalanceRepo(session), PaymentRepo(session))
+
+    async def race():
+        return await asyncio.gather(
+            webhook.process_paid({"invoice_id": 102, "payload": f"topup:{user_id}:10"}),
+            button(),
+        )
+
+    _, credited = db.run(race())
+    assert db.run(db.scalar(select(func.count()).select_from(BalanceEntry))) == 1
+    assert db.run(db.scalar(select(User.balance_minor).where(User.id == user_id))) > 0
+    assert (credited is not None) + len(webhook._bot.sent) == 1
+
+
+def test_webhook_restores_archived_invoice(db, webhook):
+    user_id = create_payment(db, "103", "7d", 0.39)
+
+    async def archive() -> int:
+        async with db.factory() as session:
+            return await ArchiveRepo(session).archive_payments(datetime.utcnow() + timedelta(days=1), 10)
+
+    assert db.run(archive()) == 1
+    db.run(webhook.process_paid({"invoice_id": 103, "payload": f"{user_id}:7d"}))
+    # Повтор вебхука ничего не выдаёт второй раз
+    db.run(webhook.process_paid({"invoice_id": 103, "payload": f"{user_id}:7d"}))
+
+    assert db.run(db.scalar(select(Payment.is_paid).where(Payment.invoice_id == "103"))) is True
+    assert db.run(db.scalar(select(func.count()).select_from(PaymentArchive))) == 0
+    assert db.run(db.scalar(select(func.count()).select_from(Subscription))) == 1
+    assert [chat_id for chat_id, _ in webhook._bot.sent] == [TELEGRAM_ID]
+
+
+def test_webhook_unknown_invoice_raises(db, webhook):
+    user_id = db.run(db.create_user(TELEGRAM_ID))
+    with pytest.raises(InvoiceNotFound):
+        db.run(webhook.process_paid({"invoice_id": 404, "payload": f"{user_id}:7d"}))
+    assert db.run(db.scalar(select(func.count()).select_from(Subscription))) == 0
+    assert webhook._bot.sent == []
+
+
+def test_webhook_http_statuses(db, webhook):
+    user_id = db.run(db.create_user(TELEGRAM_ID))
+    # Тело — как у локальной замены CryptoPay из scripts/send_crypto_webhook.py
+    update = invoice_paid(404, f"{user_id}:7d")
+
+    async def post_all() -> tuple[int, int, int]:
+        async with TestClient(TestServer(webhook.app())) as client:
+            # Неизвестный инвойс — 503, чтобы CryptoPay повторил запрос
+            body, headers = signed(update)
+            unknown = (await client.post("/hook", data=body, headers=headers)).status
+            body, headers = signed(update, token="other")
+            forged = (await client.post("/hook", data=body, headers=headers)).status
+            body, headers = signed({"update_id": 2, "update_type": "other"})
+            ignored = (await client.post("/hook", data=body, headers=headers)).status
+            return unknown, forged, ignored
+
+    assert db.run(post_all()) == (503, 401, 200)
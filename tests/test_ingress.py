@@ -0,0 +1,70 @@
+import asyncio
+import time
+from aiogram.types import Chat, Message, Update, User
+from services.ingress import IngressQueue
+
+SLOW = 0.2
+
+
+def message(update_id: int, user_id: int, text: str) -> Update:
+    return Update.model_construct(
+        update_id=update_id,
+        message=Message.model_construct(
+            chat=Chat.model_construct(id=user_id, type="private"),
+            from_user=User(id=user_id, is_bot=False, first_name="User"),
+            text=text,
+        ),
+    )
+
+
+class FakeDispatcher:
+    """feed_update пользователя 1 — медленный хендлер, остальные отвечают сразу."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.calls: list[tuple[int, float]] = []
+        self.running: set[int] = set()
+        self.overlapped = False
+
+    async def feed_update(self, bot, update: Update) -> None:
+        user_id = update.message.from_user.id
+        self.overlapped |= user_id in self.running
+        self.running.add(user_id)
+        self.calls.append((update.update_id, time.monotonic() - self.started))
+        await asyncio.sleep(SLOW if user_id == 1 else 0)
+        self.running.discard(user_id)
+
+
+async def drain(ingress: IngressQueue, dp: FakeDispatcher, updates: list[Update], total: int) -> None:
+    workers = [asyncio.create_task(ingress._worker(None, dp)) for _ in range(ingress.workers)]
+    for update in updates:
+        ingress.put(update)
+    while ingress.processed < total:
+        await asyncio.sleep(0.01)
+    for worker in workers:
+        worker.cancel()
+
+
+def test_user_backlog_does_not_hold_workers():
+    ingress = IngressQueue(max_queue=100, deadline=60, workers=4)
+    dp = FakeDispatcher()
+    updates = [message(i, 1, f"/slow {i}") for i in range(4)] + [message(10, 2, "/menu")]
+    asyncio.run(drain(ingress, dp, updates, total=5))
+
+    started = dict(dp.calls)
+    # Второй пользователь не ждёт хвост первого
+    assert started[10] < SLOW
+    # Апдейты первого — строго по очереди и не параллельно
+    assert [update_id for update_id, _ in dp.calls if update_id < 10] == [0, 1, 2, 3]
+    assert not dp.overlapped
+    assert ingress.stats().depth == 0
+
+
+def test_overflow_evicts_oldest_low_priority_update():
+    ingress = IngressQueue(max_queue=2, deadline=60, workers=1)
+    for update_id, user_id in enumerate((1, 2, 3)):
+        ingress.put(message(update_id, user_id, "/menu"))
+
+    stats = ingress.stats()
+    assert (stats.depth, stats.low_depth, stats.shed_overflow) == (2, 2, 1)
+    assert [queue[0].update.update_id for queue in ingress._queues.values() if queue] == [1, 2]
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from db.migrations import BASELINE_VERSION, LATEST_VERSION, _stamp, migrate
+from db.models import GateMember, SchemaVersion, Subscription, SubscriptionArchive, User
+from db.repository import GateMemberRepo, SubscriptionRepo, UserRepo
+
+
+def test_migrations_upgrade_from_baseline(db):
+    async def upgrade() -> int:
+        # Схема как у БД до появления миграций: все миграции проходят поверх неё
+        async with db.engine.begin() as conn:
+            await conn.run_sync(_stamp, BASELINE_VERSION)
+        await migrate(db.engine)
+        return await db.scalar(select(SchemaVersion.version))
+
+    assert db.run(upgrade()) == LATEST_VERSION
+
+
+def test_insert_many_skips_existing_users(db):
+    db.run(db.create_user(1))
+
+    async def insert_many() -> list[tuple[int, str]]:
+        async with db.factory() as session:
+            await UserRepo(session).insert_many({1: ("Renamed", None), 2: ("Second", "second")})
+            rows = await session.execute(select(User.telegram_id, User.full_name).order_by(User.telegram_id))
+            return [tuple(row) for row in rows]
+
+    assert db.run(insert_many()) == [(1, "Test User"), (2, "Second")]
+
+
+def test_gate_member_upsert_updates_existing_row(db):
+    async def upsert() -> list[tuple[str, int, bool]]:
+        async with db.factory() as session:
+            repo = GateMemberRepo(session)
+            await repo.upsert("@channel", 7, True)
+            await repo.upsert("@channel", 7, False)
+            return [(m.channel, m.user_id, m.is_member) for m in await repo.get_all()]
+
+    assert db.run(upsert()) == [("@channel", 7, False)]
+
+
+def test_history_keyset_pages_cover_archive(db):
+    user_id = db.run(db.create_user())
+    start = datetime(2024, 1, 1)
+
+    async def fill() -> list[int]:
+        # Соседние подписки с одинаковым started_at различает только id
+        rows = [
+            {"id": i, "user_id": user_id, "tariff_id": "7d", "started_at": start + timedelta(days=i // 2),
+             "expires_at": start + timedelta(days=i // 2 + 7), "is_active": False}
+            for i in range(1, 8)
+        ]
+        async with db.factory() as session:
+            await session.execute(insert(SubscriptionArchive), [row for row in rows if row["id"] % 2])
+            await session.execute(insert(Subscription), [row for row in rows if not row["id"] % 2])
+            await session.execute(User.__table__.update().values(sub_count=len(rows)))
+            await session.commit()
+        return [row["id"] for row in reversed(rows)]
+
+    async def pages(newer: bool, cursor=None) -> list[list[int]]:
+        result = []
+        async with db.factory() as session:
+            repo = SubscriptionRepo(session)
+            while True:
+                page = await repo.get_page(user_id, cursor, newer=newer, limit=3)
+                result.append([row.id for row in page.rows])
+                if not page.has_more:
+                    return result
+                edge = page.rows[0] if newer else page.rows[-1]
+                cursor = (edge.started_at, edge.id)
+
+    expected = db.run(fill())
+    assert db.run(pages(newer=False)) == [expected[:3], expected[3:6], expected[6:]]
+    # Листание назад от самой старой строки
+    assert db.run(pages(newer=True, cursor=(start, 0))) == [expected[4:], expected[1:4], expected[:1]]
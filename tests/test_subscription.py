@@ -0,0 +1,34 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from services.channel_catalog import GateChannelInfo
+from utils.subscription import check_subscriptions_concurrent
+
+
+class HangingBot:
+    """get_chat_member отвечает только для каналов из `members`, остальные висят."""
+
+    def __init__(self, members: set[str]):
+        self.members = members
+
+    async def get_chat_member(self, chat_id: str, user_id: int):
+        if chat_id not in self.members:
+            await asyncio.sleep(60)
+        return SimpleNamespace(status="member")
+
+
+def test_single_channel_check_times_out():
+    channels = [GateChannelInfo(id=1, username="@hanging", title="Hanging")]
+    started = time.monotonic()
+    result = asyncio.run(check_subscriptions_concurrent(HangingBot(set()), 1, channels, timeout=0.05))
+    assert result == channels
+    assert time.monotonic() - started < 1
+
+
+def test_concurrent_check_keeps_channel_order():
+    channels = [
+        GateChannelInfo(id=i, username=f"@channel{i}", title=f"Channel {i}") for i in range(4)
+    ]
+    bot = HangingBot({"@channel1", "@channel2"})
+    result = asyncio.run(check_subscriptions_concurrent(bot, 2, channels, force_refresh=True, timeout=0.05))
+    assert result == [channels[0], channels[3]]
@@ -0,0 +1,34 @@
+import asyncio
+from aiogram.types import Update, User
+from core.config import ThrottleRule
+from middlewares.throttling import ThrottlingMiddleware
+
+ADMIN = User(id=42, is_bot=False, first_name="Admin")
+RULE = ThrottleRule(limit=3, window=60.0)
+
+
+def feed(updates: list[Update]) -> int:
+    middleware = ThrottlingMiddleware({"payment": RULE, "menu": RULE, "admin": RULE})
+    handled = 0
+
+    async def handler(event, data):
+        nonlocal handled
+        handled += 1
+
+    async def run():
+        for update in updates:
+            await middleware(handler, update, {"event_from_user": ADMIN})
+
+    asyncio.run(run())
+    return handled
+
+
+def test_chat_member_updates_are_not_throttled():
+    # В chat_member «пользователь» — администратор, который кикает участников пачкой
+    updates = [Update.model_construct(update_id=i, chat_member=object()) for i in range(20)]
+    assert feed(updates) == 20
+
+
+def test_messages_are_throttled():
+    updates = [Update.model_construct(update_id=i, message=object()) for i in range(20)]
+    assert feed(updates) == RULE.limit
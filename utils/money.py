@@ -0,0 +1,17 @@
+# Курс пополнения и оплаты с баланса (можно вынести в .env)
+USD_TO_RUB = 90
+
+
+def usd_to_minor(usd: float) -> int:
+    """Доллары -> копейки по курсу USD_TO_RUB."""
+    return round(usd * USD_TO_RUB * 100)
+
+
+def rub_to_minor(rub: float) -> int:
+    return round(rub * 100)
+
+
+def format_rub(minor: int) -> str:
+    if minor % 100 == 0:
+        return f"{minor // 100}₽"
+    return f"{minor / 100:.2f}₽"
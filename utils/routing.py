@@ -0,0 +1,89 @@
+from typing import Any, Callable
+from aiogram import Router
+from aiogram.dispatcher.event.handler import CallableObject
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+
+class RouteIndex:
+    """
+    Индекс маршрутов: callback_data по префиксу и тексты кнопок меню по точному совпадению.
+    Вместо перебора фильтров всех хендлеров апдейт находит свой хендлер одним поиском в dict.
+
+    Хендлер получает те же аргументы, что и обычный хендлер aiogram,
+    плюс `callback_data` (распакованный CallbackData) для префиксных маршрутов.
+    """
+
+    def __init__(self, name: str = "routes"):
+        self.router = Router(name=name)
+        self._callbacks: dict[str, tuple[type[CallbackData] | None, CallableObject]] = {}
+        self._texts: dict[str, CallableObject] = {}
+        self.router.callback_query.register(self._dispatch, self._match_callback)
+        self.router.message.register(self._dispatch, self._match_text)
+
+    def callback(self, key: str | type[CallbackData]) -> Callable:
+        """Регистрирует хендлер на точный callback_data или на CallbackData-фабрику."""
+        def decorator(func: Callable) -> Callable:
+            if isinstance(key, str):
+                self._add_callback(key, None, func)
+            else:
+                self._add_callback(key.__prefix__, key, func)
+            return func
+        return decorator
+
+    def text(self, *texts: str) -> Callable:
+        """Регистрирует хендлер на точный текст сообщения (кнопки reply-клавиатуры)."""
+        def decorator(func: Callable) -> Callable:
+            for text in texts:
+                if text in self._texts:
+                    raise ValueError(f"Маршрут для текста {text!r} уже зарегистрирован")
+                self._texts[text] = CallableObject(func)
+            return func
+        return decorator
+
+    def _add_callback(self, key: str, factory: type[CallbackData] | None, func: Callable) -> None:
+        if key in self._callbacks:
+            raise ValueError(f"Маршрут для callback {key!r} уже зарегистрирован")
+        self._callbacks[key] = (factory, CallableObject(func))
+
+    def resolve_callback(self, data: str | None) -> tuple[CallableObject, CallbackData | None] | None:
+        if not data:
+            return None
+        prefix, separator, _ = data.partition(":")
+        if not separator:
+            entry = self._callbacks.get(data)
+            if entry is None or entry[0] is not None:
+                return None
+            return entry[1], None
+        entry = self._callbacks.get(prefix)
+        if entry is None or entry[0] is None:
+            return None
+        factory, target = entry
+        try:
+            return target, factory.unpack(data)
+        except (TypeError, ValueError):
+            return None
+
+    def resolve_text(self, text: str | None) -> CallableObject | None:
+        return self._texts.get(text) if text else None
+
+    # Фильтры асинхронные: синхронные aiogram запускает через asyncio.to_thread
+    async def _match_callback(self, callback: CallbackQuery) -> dict[str, Any] | bool:
+        resolved = self.resolve_callback(callback.data)
+        if resolved is None:
+            return False
+        target, callback_data = resolved
+        if callback_data is None:
+            return {"route": target}
+        return {"route": target, "callback_data": callback_data}
+
+    async def _match_text(self, message: Message) -> dict[str, Any] | bool:
+        target = self.resolve_text(message.text)
+        return {"route": target} if target else False
+
+    @staticmethod
+    async def _dispatch(event: TelegramObject, route: CallableObject, **data: Any) -> Any:
+        return await route.call(event, **data)
+
+
+routes = RouteIndex()
@@ -1,22 +1,110 @@
+import asyncio
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
-from db.models import GateChannel
-from typing import List
+from core.config import config
+from services.channel_catalog import GateChannelInfo
+from services.membership_cache import membership_cache
+from services.gate_index import gate_index
+from typing import List, Sequence
 import logging
 
 
-async def check_subscriptions_db(bot: Bot, user_id: int, channels: List[GateChannel]) -> List[GateChannel]:
-    """Возвращает каналы на которые пользователь НЕ подписан."""
+def _is_user_error(error: TelegramBadRequest) -> bool:
+    """Ошибка относится к конкретному пользователю, а не к каналу целиком."""
+    text = str(error.message).lower()
+    return "user" in text or "participant" in text
+
+
+async def _is_subscribed(bot: Bot, user_id: int, channel: GateChannelInfo, force_refresh: bool) -> bool:
+    """
+    Проверяет подписку на один канал: сначала индекс из chat_member апдейтов
+    (только для каналов, где бот администратор), затем кэш, и только потом Bot API.
+    Ответы Bot API идут только в TTL-кэш: в бессрочный индекс их писать нельзя,
+    выход из канала без chat_member апдейтов его бы не исправил.
+    """
+    if not force_refresh:
+        indexed = gate_index.get(user_id, channel.username)
+        if indexed is not None:
+            return indexed
+        if membership_cache.is_channel_broken(channel.username):
+            return False
+        cached = membership_cache.get(user_id, channel.username)
+        if cached is not None:
+            return cached
+
+    try:
+        member = await bot.get_chat_member(chat_id=channel.username, user_id=user_id)
+        logging.info(f"Канал {channel.username} | Статус: {member.status}")
+        is_member = member.status not in ("left", "kicked", "banned")
+        membership_cache.set(user_id, channel.username, is_member)
+        return is_member
+    except TelegramBadRequest as e:
+        logging.warning(f"Ошибка проверки канала {channel.username}: {e}")
+        if _is_user_error(e):
+            membership_cache.set(user_id, channel.username, False)
+        else:
+            membership_cache.mark_channel_broken(channel.username)
+        return False
+    except TelegramForbiddenError as e:
+        logging.warning(f"Ошибка проверки канала {channel.username}: {e}")
+        membership_cache.mark_channel_broken(channel.username)
+        return False
+
+
+async def check_subscriptions_db(
+    bot: Bot,
+    user_id: int,
+    channels: Sequence[GateChannelInfo],
+    force_refresh: bool = False,
+) -> List[GateChannelInfo]:
+    """
+    Возвращает каналы на которые пользователь НЕ подписан.
+    Результаты кэшируются; force_refresh=True игнорирует кэш (кнопка «Проверить подписку»).
+    """
     not_subscribed = []
 
     for channel in channels:
-        try:
-            member = await bot.get_chat_member(chat_id=channel.username, user_id=user_id)
-            logging.info(f"Канал {channel.username} | Статус: {member.status}")
-            if member.status in ("left", "kicked", "banned"):
-                not_subscribed.append(channel)
-        except (TelegramForbiddenError, TelegramBadRequest) as e:
-            logging.warning(f"Ошибка проверки канала {channel.username}: {e}")
+        if not await _is_subscribed(bot, user_id, channel, force_refresh):
             not_subscribed.append(channel)
 
-    return not_subscribed
\ No newline at end of file
+    return not_subscribed
+
+
+async def check_subscriptions_concurrent(
+    bot: Bot,
+    user_id: int,
+    channels: Sequence[GateChannelInfo],
+    force_refresh: bool = False,
+    concurrency: int | None = None,
+    timeout: float | None = None,
+) -> List[GateChannelInfo]:
+    """
+    То же что check_subscriptions_db, но проверяет каналы параллельно.
+    Не больше `concurrency` запросов одновременно, каждый ограничен `timeout` секундами.
+    Порядок каналов в результате совпадает с исходным.
+    Канал, не ответивший вовремя, считается неподписанным (в кэш не пишется).
+    """
+    if not channels:
+        return []
+
+    concurrency = concurrency or config.gate_check_concurrency
+    timeout = timeout or config.gate_check_timeout
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(channel: GateChannelInfo) -> bool:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(
+                    _is_subscribed(bot, user_id, channel, force_refresh),
+                    timeout=timeout,
+                )
+            except asyncio.TimeoutError:
+                logging.warning(f"Таймаут проверки канала {channel.username}")
+                return False
+
+    if len(channels) == 1:
+        # Один канал — без gather, но с тем же таймаутом: зависший get_chat_member не держит апдейт
+        results = [await check(channels[0])]
+    else:
+        results = await asyncio.gather(*(check(channel) for channel in channels))
+    return [channel for channel, ok in zip(channels, results) if not ok]